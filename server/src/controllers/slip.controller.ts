@@ -79,8 +79,8 @@ export class SlipController {
   // POST /api/slips/callback
   async handleOcrCallback(req: Request, res: Response): Promise<void> {
     try {
-      // notify.py sends: { slipId, status, data }
-      const { slipId, status, data } = req.body;
+      // notify.py sends: { slipId, status, data, trace? }
+      const { slipId, status, data, trace } = req.body;
 
       if (!slipId || !status) {
         res.status(400).json({ error: 'Missing slipId or status' });
@@ -88,6 +88,13 @@ export class SlipController {
       }
 
       console.log(`[OCR Callback] Received for slip ${slipId}: ${status}`);
+      if (trace) {
+        console.log(
+          `[OCR Callback] trace=${trace.traceId} queueWait=${trace.queueWaitSeconds}s ` +
+            `poolWait=${trace.poolWaitSeconds}s service=${trace.serviceSeconds}s ` +
+            `attempt=${trace.attempt ?? 1} sinceFirstAttempt=${trace.sinceFirstAttemptSeconds ?? 0}s`,
+        );
+      }
 
       // Map worker status to SlipStatus
       // Worker sends: "success" or "failed"
@@ -1,5 +1,6 @@
+import hmac
 from threading import Thread
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
 
 # OCR worker
 from src.queue.consumer import start_consumer
@@ -7,6 +8,21 @@ from src.queue.consumer import start_consumer
 # health check
 from src.health.health import get_health_status
 
+# metrics (autoscaler / pool)
+from src.metrics.registry import render_prometheus
+
+# profiling (admin)
+from config import ADMIN_TOKEN
+from src.profiling.profiler import (
+    CaptureBusyError,
+    run_capture,
+    list_slow_jobs,
+    get_slow_job,
+)
+
+# dead-letter queue (admin)
+from src.queue import dead_letter
+
 
 # --------------------
 # Flask App
@@ -23,6 +39,143 @@ def health():
     return jsonify(get_health_status()), 200
 
 
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """
+    Metrics endpoint (Prometheus text format)
+    ขนาด pool, backlog, latency และ decision ของ autoscaler
+    """
+    return Response(render_prometheus(), mimetype="text/plain"), 200
+
+
+def _admin_denied():
+    """
+    admin routes ปิดอยู่จนกว่าจะตั้ง ADMIN_TOKEN และต้องส่ง header X-Admin-Token ให้ตรง
+    """
+    if not ADMIN_TOKEN:
+        return jsonify({"status": "error", "message": "Admin API disabled (ADMIN_TOKEN not set)"}), 404
+
+    token = request.headers.get("X-Admin-Token", "")
+    if not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        return jsonify({"status": "error", "message": "Forbidden"}), 403
+    return None
+
+
+@app.route("/admin/profile", methods=["POST"])
+def admin_profile():
+    """
+    On-demand profiling
+    profile ทุกงานที่เริ่มใน N วินาที (?seconds=) หรือ N งาน (?jobs=) แล้วคืน cProfile stats
+    """
+    denied = _admin_denied()
+    if denied:
+        return denied
+
+    seconds = request.args.get("seconds", type=float)
+    jobs = request.args.get("jobs", type=int)
+    sort = request.args.get("sort", "cumulative")
+    limit = request.args.get("limit", 40, type=int)
+
+    if not seconds and not jobs:
+        return jsonify({
+            "status": "error",
+            "message": "seconds or jobs is required"
+        }), 400
+
+    try:
+        result = run_capture(seconds=seconds, jobs=jobs, sort=sort, limit=limit)
+    except CaptureBusyError as e:
+        return jsonify({"status": "error", "message": str(e)}), 409
+
+    return jsonify(result), 200
+
+
+@app.route("/admin/profiles/slow", methods=["GET"])
+def admin_slow_jobs():
+    """
+    รายการ job ที่ช้ากว่า SLOW_JOB_THRESHOLD (ล่าสุดก่อน)
+    """
+    denied = _admin_denied()
+    if denied:
+        return denied
+
+    return jsonify(list_slow_jobs()), 200
+
+
+@app.route("/admin/profiles/slow/<name>", methods=["GET"])
+def admin_slow_job(name):
+    """
+    stage breakdown + stack samples (+ cProfile stats ถ้ามี) ของ slow job
+    """
+    denied = _admin_denied()
+    if denied:
+        return denied
+
+    entry = get_slow_job(
+        name,
+        sort=request.args.get("sort", "cumulative"),
+        limit=request.args.get("limit", 40, type=int)
+    )
+    if entry is None:
+        return jsonify({"status": "error", "message": "Not found"}), 404
+
+    return jsonify(entry), 200
+
+
+@app.route("/admin/dlq", methods=["GET"])
+def admin_dlq():
+    """
+    รายการ job ใน dead-letter store (ล่าสุดก่อน)
+    ?quarantined=1 เฉพาะที่ถูก quarantine
+    """
+    denied = _admin_denied()
+    if denied:
+        return denied
+
+    entries = dead_letter.list_entries(
+        quarantined_only=request.args.get("quarantined") in ("1", "true"),
+        limit=request.args.get("limit", 100, type=int)
+    )
+    return jsonify(entries), 200
+
+
+@app.route("/admin/dlq/<job_id>", methods=["GET", "DELETE"])
+def admin_dlq_entry(job_id):
+    """
+    ดู (GET) หรือลบ (DELETE) job ใน dead-letter store
+    """
+    denied = _admin_denied()
+    if denied:
+        return denied
+
+    if request.method == "DELETE":
+        if not dead_letter.discard(job_id):
+            return jsonify({"status": "error", "message": "Not found"}), 404
+        return jsonify({"status": "deleted", "job_id": job_id}), 200
+
+    entry = dead_letter.get_entry(job_id)
+    if entry is None:
+        return jsonify({"status": "error", "message": "Not found"}), 404
+
+    return jsonify(entry), 200
+
+
+@app.route("/admin/dlq/<job_id>/replay", methods=["POST"])
+def admin_dlq_replay(job_id):
+    """
+    ปลด quarantine แล้ว publish job เดิมกลับเข้า queue
+    """
+    denied = _admin_denied()
+    if denied:
+        return denied
+
+    entry = dead_letter.replay(job_id)
+    if entry is None:
+        return jsonify({"status": "error", "message": "Not found"}), 404
+
+    return jsonify({"status": "replayed", "job_id": job_id}), 200
+
+
 @app.route("/callback/ocr", methods=["POST"])
 def ocr_callback():
     """
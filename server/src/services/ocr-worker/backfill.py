@@ -0,0 +1,286 @@
+"""
+Bulk backfill: re-extract slips ที่เก็บไว้แล้วผ่าน pipeline เต็ม
+
+ตัวอย่าง:
+    python backfill.py --input /app/uploads --output backfill.jsonl --workers 4
+    python backfill.py --manifest slips.txt --output backfill.jsonl --resume
+
+- อ่าน path แบบ streaming จาก directory หรือ manifest (1 path ต่อบรรทัด
+  หรือ JSON Lines ที่มี field image_path)
+- รันบน process pool โดยมีงานค้างไม่เกิน --max-pending (จำกัด memory)
+- เขียนผลเป็น JSON Lines และ checkpoint เฉพาะ path ที่สำเร็จแล้ว
+  รันซ้ำด้วย --resume จะข้ามงานที่สำเร็จไปแล้ว และลองงานที่ fail ใหม่
+  (at-least-once: output อาจมีหลายบรรทัดต่อ image_path ให้ dedupe โดยใช้บรรทัดล่าสุด)
+- exit code: 0 = ไม่มีงาน fail ค้าง, 1 = มีงาน fail (resume เพื่อลองใหม่), 2 = pool พัง
+- ใช้ OCR result cache และไม่เขียน debug artifacts ลง logs/
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp", ".bmp")
+
+# cache ต่อ worker process (สร้างใน initializer)
+_cache = None
+
+
+# --------------------
+# Input
+# --------------------
+def iter_directory(root: str):
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                yield os.path.join(dirpath, name)
+
+
+def iter_manifest(path: str):
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("{"):
+                yield json.loads(line)["image_path"]
+            else:
+                yield line
+
+
+# --------------------
+# Checkpoint
+# --------------------
+def load_checkpoint(path: str) -> set:
+    if not os.path.exists(path):
+        return set()
+
+    with open(path, "r", encoding="utf-8") as f:
+        return {line.rstrip("\n") for line in f if line.endswith("\n")}
+
+
+def trim_partial_line(path: str):
+    """
+    ตัดบรรทัดสุดท้ายที่เขียนไม่จบ (กรณีถูก kill ระหว่างเขียน)
+    """
+    if not os.path.exists(path):
+        return
+
+    with open(path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+
+
+# --------------------
+# Worker
+# --------------------
+def _init_worker(threads: int, use_cache: bool, cache_dir: str):
+    global _cache
+
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except Exception as e:
+        print(f"⚠️ Cannot set torch threads={threads}: {e}")
+
+    if use_cache:
+        from src.cache.result_cache import OcrResultCache
+        _cache = OcrResultCache(cache_dir)
+
+
+def _backfill_one(image_path: str) -> dict:
+    from src.pipeline.slip import run_slip_pipeline
+
+    job_id = os.path.splitext(os.path.basename(image_path))[0]
+    started = time.time()
+
+    try:
+        result = run_slip_pipeline(
+            image_path,
+            job_id,
+            log_artifacts=False,
+            cache=_cache
+        )
+        return {
+            "image_path": image_path,
+            "job_id": job_id,
+            "status": "success",
+            "cached": result["cached"],
+            "data": result["parsed"],
+            "seconds": round(time.time() - started, 3),
+        }
+
+    except Exception as e:
+        return {
+            "image_path": image_path,
+            "job_id": job_id,
+            "status": "failed",
+            "error": f"{type(e).__name__}: {e}",
+            "seconds": round(time.time() - started, 3),
+        }
+
+
+# --------------------
+# Runner
+# --------------------
+def run_backfill(args) -> dict:
+    checkpoint_path = args.checkpoint or f"{args.output}.checkpoint"
+
+    if args.resume:
+        trim_partial_line(args.output)
+        trim_partial_line(checkpoint_path)
+        done = load_checkpoint(checkpoint_path)
+        mode = "a"
+    else:
+        done = set()
+        mode = "w"
+
+    paths = iter_manifest(args.manifest) if args.manifest else iter_directory(args.input)
+
+    stats = {"success": 0, "failed": 0, "cached": 0, "skipped": 0}
+    started = time.time()
+
+    # ดาวน์โหลดโมเดลครั้งเดียวก่อน spawn: worker ทุกตัวแค่โหลดจากดิสก์ ไม่แย่งกันดาวน์โหลด
+    from src.ocr.extractor import download_models
+    try:
+        download_models()
+    except Exception as e:
+        print(f"⚠️ EasyOCR model download failed, workers will retry: {e}")
+
+    executor = ProcessPoolExecutor(
+        max_workers=args.workers,
+        mp_context=mp.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(args.threads, not args.no_cache, args.cache_dir),
+    )
+
+    with executor, \
+            open(args.output, mode, encoding="utf-8") as out, \
+            open(checkpoint_path, mode, encoding="utf-8") as ckpt:
+
+        pending = set()
+
+        def drain(block_until_below: int):
+            nonlocal pending
+            while len(pending) >= block_until_below:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                broken = None
+                for future in finished:
+                    try:
+                        record = future.result()
+                    except BrokenProcessPool as e:
+                        # เขียนผลของงานอื่นที่เสร็จแล้วให้ครบก่อน แล้วค่อยหยุด
+                        broken = e
+                        continue
+
+                    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    out.flush()
+                    # checkpoint หลังเขียนผลแล้วเท่านั้น และเฉพาะงานที่สำเร็จ (งาน fail ลองใหม่ตอน resume)
+                    if record["status"] == "success":
+                        ckpt.write(record["image_path"] + "\n")
+                        ckpt.flush()
+
+                    stats[record["status"]] += 1
+                    if record.get("cached"):
+                        stats["cached"] += 1
+
+                    total = stats["success"] + stats["failed"]
+                    if total % args.progress_every == 0:
+                        rate = total / max(time.time() - started, 1e-9)
+                        print(
+                            f"⏳ {total} done | success={stats['success']} "
+                            f"failed={stats['failed']} cached={stats['cached']} "
+                            f"| {rate:.2f} slips/s"
+                        )
+
+                if broken is not None:
+                    raise broken
+
+        try:
+            for image_path in paths:
+                if image_path in done:
+                    stats["skipped"] += 1
+                    continue
+
+                drain(args.max_pending)
+                pending.add(executor.submit(_backfill_one, image_path))
+
+            drain(1)
+        except BrokenProcessPool as e:
+            # worker process ตาย (เช่น OOM kill): หยุดแบบมีสรุป งานที่ checkpoint แล้วไม่หาย
+            print(f"🔴 OCR process pool broke: {e}")
+            stats["aborted"] = f"{type(e).__name__}: {e}"
+
+    stats["seconds"] = round(time.time() - started, 2)
+    return stats
+
+
+def _positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be >= 1, got {number}")
+    return number
+
+
+def parse_args(argv=None):
+    from config import cpu_limit
+
+    cpu = cpu_limit()
+
+    parser = argparse.ArgumentParser(description="Re-extract stored slips in bulk")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--input", help="directory of slip images (recursive)")
+    source.add_argument("--manifest", help="file with one image path (or JSON with image_path) per line")
+
+    parser.add_argument("--output", required=True, help="JSON Lines output file")
+    parser.add_argument("--checkpoint", help="checkpoint file (default: <output>.checkpoint)")
+    parser.add_argument("--resume", action="store_true", help="skip images that already succeeded, retry failed ones")
+    parser.add_argument("--workers", type=_positive_int, default=cpu, help="OCR processes")
+    parser.add_argument("--threads", type=_positive_int, default=1, help="torch threads per process")
+    parser.add_argument(
+        "--max-pending", type=_positive_int, default=None,
+        help="max in-flight images (default: 2 x workers)"
+    )
+    parser.add_argument("--no-cache", action="store_true", help="do not read/write the OCR result cache")
+    parser.add_argument("--cache-dir", default=None, help="OCR result cache directory")
+    parser.add_argument("--progress-every", type=_positive_int, default=50, help="print progress every N images")
+
+    args = parser.parse_args(argv)
+
+    if args.max_pending is None:
+        args.max_pending = 2 * args.workers
+    if args.cache_dir is None:
+        from config import RESULT_CACHE_DIR
+        args.cache_dir = RESULT_CACHE_DIR
+
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    print(f"🟢 Backfill started | workers={args.workers} output={args.output}")
+    stats = run_backfill(args)
+
+    if "aborted" in stats:
+        print(f"⚠️ Backfill aborted | {stats}")
+        print("🔄 Re-run with --resume to continue from the checkpoint")
+        return 2
+
+    if stats["failed"]:
+        print(f"⚠️ Backfill finished with failures | {stats}")
+        print("🔄 Re-run with --resume to retry the failed images")
+        return 1
+
+    print(f"✅ Backfill finished | {stats}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
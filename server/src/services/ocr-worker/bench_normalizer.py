@@ -0,0 +1,80 @@
+"""
+Micro-benchmark ของ src/parser/normalizer.py (timing อย่างเดียว)
+
+    python bench_normalizer.py            # timing
+    python bench_normalizer.py -n 50000   # จำนวนรอบ
+
+ความถูกต้องตรวจใน tests/test_normalizer.py (pytest)
+ข้อความตัวอย่างเป็นแบบที่ OCR อ่านได้จริงจาก zone วันที่ / จำนวนเงิน
+"""
+
+import argparse
+import sys
+import time
+
+from src.parser.normalizer import normalize_date, normalize_amount
+
+DATE_INPUTS = [
+    "01/02/2025",
+    "1/2/25",
+    "01-02-2025 10:32",
+    "2025-02-01",
+    "20250201",
+    "01 / 02 / 2568",
+    "1 ก.พ. 2568",
+    "1 ก.พ 68 14:05 น.",
+    "1ก.พ.68",
+    "๑ ก.พ. ๒๕๖๘",
+    "15 มกราคม 2568",
+    "วันที่ 12 มิ.ย. 2568 เวลา 18:40",
+    "12 Jun 2025 18:40",
+    "14:05 น. 01/02/25",
+    "32/01/2025 01/02/2025",
+    "ไม่มีวันที่",
+]
+
+AMOUNT_INPUTS = [
+    "1,250.00",
+    "฿ 1,250.00",
+    "12,50",
+    "350 . 50 บาท",
+    "๑,๒๕๐.๐๐",
+    "10,000,000.00 THB",
+    "จำนวน: 99.00",
+    "บาท",
+]
+
+
+def bench(fn, raws, rounds: int):
+
+    # cold: ไม่ใช้ cache (วัดความเร็วของการ parse จริง)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn.cache_clear()
+        for raw in raws:
+            fn(raw)
+    cold = (time.perf_counter() - start) / (rounds * len(raws))
+
+    # warm: ค่าเดิมซ้ำ (เช่นเรียกซ้ำใน parse_bill_slip / layout เดิม)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for raw in raws:
+            fn(raw)
+    warm = (time.perf_counter() - start) / (rounds * len(raws))
+
+    print(f"{fn.__name__}: cold {cold * 1e6:.2f} µs/call | cached {warm * 1e6:.2f} µs/call")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark date / amount normalizer")
+    parser.add_argument("-n", "--rounds", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    bench(normalize_date, DATE_INPUTS, args.rounds)
+    bench(normalize_amount, AMOUNT_INPUTS, args.rounds)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
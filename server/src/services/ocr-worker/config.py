@@ -1,8 +1,40 @@
+import math
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
+
+def cpu_limit() -> int:
+    """
+    จำนวน CPU ที่ container ใช้ได้จริง (cgroup quota) ไม่ใช่จำนวน core ของเครื่อง host
+    """
+    cores = os.cpu_count() or 1
+
+    try:
+        # cgroup v2: "<quota> <period>" หรือ "max <period>"
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()[:2]
+        if quota != "max":
+            return max(min(math.ceil(int(quota) / int(period)), cores), 1)
+        return cores
+    except (OSError, ValueError):
+        pass
+
+    try:
+        # cgroup v1: quota = -1 คือไม่จำกัด
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+            quota = int(f.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+            period = int(f.read())
+        if quota > 0 and period > 0:
+            return max(min(math.ceil(quota / period), cores), 1)
+    except (OSError, ValueError):
+        pass
+
+    return cores
+
+
 # --------------------
 # Redis
 # --------------------
@@ -11,3 +43,62 @@ REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
 REDIS_CHANNEL = os.getenv("REDIS_CHANNEL", "ocr:jobs")
 
 
+# --------------------
+# OCR worker pool / autoscaling
+# --------------------
+OCR_MIN_PROCESSES = int(os.getenv("OCR_MIN_PROCESSES", 1))
+# แต่ละ process โหลดโมเดล EasyOCR ของตัวเอง (~400MB) ตั้งให้พอดีกับ memory limit ของ container ด้วย
+OCR_MAX_PROCESSES = int(os.getenv("OCR_MAX_PROCESSES", cpu_limit()))
+OCR_MIN_THREADS = int(os.getenv("OCR_MIN_THREADS", 1))
+OCR_MAX_THREADS = int(os.getenv("OCR_MAX_THREADS", cpu_limit()))
+AUTOSCALE_TARGET_P95 = float(os.getenv("AUTOSCALE_TARGET_P95", 10.0))  # seconds
+AUTOSCALE_INTERVAL = float(os.getenv("AUTOSCALE_INTERVAL", 5.0))  # seconds
+AUTOSCALE_COOLDOWN = float(os.getenv("AUTOSCALE_COOLDOWN", 30.0))  # seconds
+AUTOSCALE_WINDOW = int(os.getenv("AUTOSCALE_WINDOW", 100))  # recent jobs
+AUTOSCALE_CHANNEL = os.getenv("AUTOSCALE_CHANNEL", "ocr:autoscale")
+
+# --------------------
+# OCR result cache (backfill)
+# --------------------
+RESULT_CACHE_DIR = os.getenv("RESULT_CACHE_DIR", "cache/ocr")
+
+# --------------------
+# Profiling
+# --------------------
+PROFILE_DIR = os.getenv("PROFILE_DIR", "logs/profiles")
+SLOW_JOB_THRESHOLD = float(os.getenv("SLOW_JOB_THRESHOLD", 30.0))  # seconds
+# every job is stack-sampled (cheap, fixed cost per sample); slow / killed jobs keep the samples
+SLOW_JOB_SAMPLE_INTERVAL = float(os.getenv("SLOW_JOB_SAMPLE_INTERVAL", 0.01))  # seconds, 0 = off
+# fraction of jobs additionally run under cProfile (exact call counts, 0 = samples only)
+# cProfile slows Python-heavy code ~4x (parse: 0.34ms → 1.45ms per slip)
+SLOW_JOB_PROFILE_RATE = float(os.getenv("SLOW_JOB_PROFILE_RATE", 0.0))
+PROFILE_MAX_SLOW = int(os.getenv("PROFILE_MAX_SLOW", 50))  # profiles kept on disk
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", 300.0))
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")  # admin routes (/admin/*) are disabled while empty
+
+# --------------------
+# Job idempotency (Redis leases)
+# --------------------
+JOB_LEASE_TTL = int(os.getenv("JOB_LEASE_TTL", 60))  # seconds, renewed while running
+JOB_RESULT_TTL = int(os.getenv("JOB_RESULT_TTL", 3600))  # seconds a finished result is replayed
+
+# --------------------
+# Dead-letter queue
+# --------------------
+OCR_JOB_TIMEOUT = float(os.getenv("OCR_JOB_TIMEOUT", 180.0))  # seconds before a job's process is killed
+DLQ_MAX_ATTEMPTS = int(os.getenv("DLQ_MAX_ATTEMPTS", 3))  # attempts before quarantine
+DLQ_RETRY_BACKOFF = float(os.getenv("DLQ_RETRY_BACKOFF", 30.0))  # seconds, doubled per attempt
+DLQ_RETRY_MAX_BACKOFF = float(os.getenv("DLQ_RETRY_MAX_BACKOFF", 600.0))  # seconds, cap for the doubling
+DLQ_TTL = int(os.getenv("DLQ_TTL", 7 * 24 * 3600))  # seconds an entry is kept
+
+# --------------------
+# Recognition cache (per OCR process)
+# --------------------
+RECOG_CACHE_SIZE = int(os.getenv("RECOG_CACHE_SIZE", 2048))  # text-line crops, 0 = disabled
+RECOG_CACHE_MAX_DISTANCE = int(os.getenv("RECOG_CACHE_MAX_DISTANCE", 12))  # differing bits (of 256) still a hit
+
+# --------------------
+# Job tracing
+# --------------------
+TRACE_EXPORT_FILE = os.getenv("TRACE_EXPORT_FILE", "")  # OTLP/JSON lines, empty = disabled
+TRACE_SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "ocr-worker")
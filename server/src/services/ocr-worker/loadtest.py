@@ -0,0 +1,558 @@
+"""
+End-to-end load generator สำหรับ OCR worker
+
+ตัวอย่าง:
+    # 2 jobs/s นาน 60s ด้วยสลิปจริงจาก corpus
+    python loadtest.py --corpus /app/uploads --rate 2 --duration 60 --report lt.json
+
+    # closed-loop: ค้าง 8 งานตลอดเวลา รวม 200 งาน ด้วยสลิป synthetic
+    python loadtest.py --concurrency 8 --jobs 200 --worker-pid 1234
+
+- publish job เข้า Redis แบบเดียวกับ QueueService.publishOcrJob
+- callback_url ชี้ไปที่ sink ในเครื่อง (แบบเดียวกับ /callback/ocr ใน app.py)
+- รายงาน latency distribution, throughput, lost jobs และ CPU / RSS ของ worker
+- ใช้ --seed เดิม = ลำดับรูป / เวลา publish เดิม เพื่อเทียบ config ต่าง ๆ ได้
+- จบ run แล้วลบ job ของ run นี้ออกจาก dead-letter store (ไม่ให้ค้างใน /admin/dlq หรือถูก retry)
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+
+import redis
+from flask import Flask, jsonify, request
+from werkzeug.serving import make_server
+
+from config import REDIS_HOST, REDIS_PORT, REDIS_CHANNEL
+from src.queue.dead_letter import DLQ_ENTRY_KEY, DLQ_INDEX_KEY, DLQ_RETRY_KEY
+from src.zoning.transaction_detector import TRANSACTION_HEADER_ZONE
+from src.scaling.autoscaler import percentile
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp", ".bmp")
+
+# job_id ของ load test: lt-<run_id>-<seq> (แยกออกจากงานจริงใน log ได้ง่าย)
+JOB_PREFIX = "lt-"
+
+# font ภาษาไทยที่มักมีในเครื่อง (fonts-thai-tlwg / Noto) ใช้ตัวแรกที่เจอถ้าไม่ได้ระบุ --font
+THAI_FONT_CANDIDATES = (
+    "/usr/share/fonts/truetype/tlwg/Loma.ttf",
+    "/usr/share/fonts/truetype/tlwg/Garuda.ttf",
+    "/usr/share/fonts/truetype/noto/NotoSansThai-Regular.ttf",
+    "/usr/share/fonts/opentype/noto/NotoSansThai-Regular.ttf",
+    "/System/Library/Fonts/Supplemental/Ayuthaya.ttf",
+)
+
+
+# --------------------
+# Callback sink
+# --------------------
+class CallbackSink:
+    """
+    รับ callback จาก worker แล้วจดเวลาที่ได้รับต่อ job
+    payload เดียวกับที่ notify.py ส่ง: { slipId, status, data, trace }
+    """
+
+    def __init__(self, host: str, port: int):
+        self.received = {}
+        self.duplicates = 0
+        self._lock = threading.Lock()
+        self._event = threading.Condition(self._lock)
+
+        app = Flask("loadtest-sink")
+        # ไม่ต้อง log ทุก request ระหว่าง load test
+        logging.getLogger("werkzeug").setLevel(logging.WARNING)
+
+        @app.route("/callback/ocr", methods=["POST"])
+        def ocr_callback():
+            data = request.get_json(silent=True)
+
+            if not data:
+                return jsonify({
+                    "status": "error",
+                    "message": "No JSON payload received"
+                }), 400
+
+            now = time.time()
+            with self._lock:
+                job_id = data.get("slipId")
+                if job_id in self.received:
+                    self.duplicates += 1
+                else:
+                    self.received[job_id] = {
+                        "received_at": now,
+                        "status": data.get("status"),
+                        "payload": data,
+                    }
+                self._event.notify_all()
+
+            return jsonify({"status": "received", "job_id": job_id}), 200
+
+        self._server = make_server(host, port, app, threaded=True)
+        self.port = self._server.server_port
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._server.shutdown()
+
+    def count(self) -> int:
+        with self._lock:
+            return len(self.received)
+
+    def wait_for(self, expected: int, timeout: float) -> bool:
+        deadline = time.time() + timeout
+        with self._lock:
+            while len(self.received) < expected:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                self._event.wait(remaining)
+        return True
+
+
+# --------------------
+# Worker resource sampler (/proc, Linux)
+# --------------------
+_CLK_TCK = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+def _proc_stat(pid: int):
+    """
+    คืน (ppid, cpu_seconds) ของ pid จาก /proc/<pid>/stat
+    """
+    with open(f"/proc/{pid}/stat", "r") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    # fields[0] = state, [1] = ppid, [11] = utime, [12] = stime
+    return int(fields[1]), (int(fields[11]) + int(fields[12])) / _CLK_TCK
+
+
+def _proc_rss(pid: int) -> int:
+    with open(f"/proc/{pid}/status", "r") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+def _process_tree(root: int) -> list:
+    """
+    pid ของ root + ลูกทั้งหมด (เช่น OCR pool processes)
+    """
+    children = {}
+    for name in os.listdir("/proc"):
+        if not name.isdigit():
+            continue
+        try:
+            ppid, _ = _proc_stat(int(name))
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(name))
+
+    tree, stack = [], [root]
+    while stack:
+        pid = stack.pop()
+        tree.append(pid)
+        stack.extend(children.get(pid, []))
+    return tree
+
+
+class ResourceSampler:
+    """
+    เก็บ CPU% และ RSS รวมของ worker process tree ทุก interval วินาที
+    """
+
+    def __init__(self, pid: int, interval: float = 1.0):
+        self.pid = pid
+        self.interval = interval
+        self.samples = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _read(self):
+        cpu, rss, count = 0.0, 0, 0
+        for pid in _process_tree(self.pid):
+            try:
+                cpu += _proc_stat(pid)[1]
+                rss += _proc_rss(pid)
+                count += 1
+            except (OSError, IndexError, ValueError):
+                continue
+        return cpu, rss, count
+
+    def _run(self):
+        started = time.time()
+        last_t, last_cpu = started, self._read()[0]
+
+        while not self._stop.wait(self.interval):
+            now = time.time()
+            cpu, rss, count = self._read()
+            self.samples.append({
+                "t": round(now - started, 2),
+                "cpu_percent": round((cpu - last_cpu) / max(now - last_t, 1e-9) * 100, 1),
+                "rss_mb": round(rss / (1024 * 1024), 1),
+                "processes": count,
+            })
+            last_t, last_cpu = now, cpu
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+
+# --------------------
+# Job sources
+# --------------------
+def load_corpus(path: str) -> list:
+    images = []
+    for dirpath, dirnames, filenames in os.walk(path):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                images.append(os.path.abspath(os.path.join(dirpath, name)))
+    return images
+
+
+def find_thai_font(path: str = None):
+    if path:
+        return path
+    for candidate in THAI_FONT_CANDIDATES:
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+def make_synthetic(out_dir: str, count: int, rng: random.Random, font_path: str = None) -> list:
+    """
+    สร้างรูปสลิปโอนเงินปลอมด้วย Pillow (ขนาด / ตำแหน่ง text ตาม zone ของสลิปจริง)
+    header "โอนเงินสำเร็จ" อยู่ใน TRANSACTION_HEADER_ZONE → parser ทำงานเต็มเหมือนสลิปจริง
+    """
+    from PIL import Image, ImageDraw, ImageFont
+
+    font_path = find_thai_font(font_path)
+    if font_path:
+        font = ImageFont.truetype(font_path, 28)
+    else:
+        # default font ของ Pillow ไม่มีอักษรไทย → parse ไม่ผ่าน (ยังวัด latency ได้)
+        print("⚠️ No Thai font found (install fonts-thai-tlwg or pass --font): synthetic slips will fail to parse")
+        font = ImageFont.load_default()
+
+    os.makedirs(out_dir, exist_ok=True)
+    images = []
+
+    width, height = 720, 1280
+    header_xy = (
+        int(TRANSACTION_HEADER_ZONE["x1"] * width) + 10,
+        int(TRANSACTION_HEADER_ZONE["y1"] * height) + 15,
+    )
+
+    for i in range(count):
+        img = Image.new("RGB", (width, height), "white")
+        draw = ImageDraw.Draw(img)
+        draw.text(header_xy, "โอนเงินสำเร็จ", fill="black", font=font)
+        draw.text((160, 490), f"ACC xxx-x-x{rng.randint(1000, 9999)}-x", fill="black", font=font)
+        draw.text((160, 760), f"PAYEE {rng.randint(100000, 999999)}", fill="black", font=font)
+        draw.text((220, 1000), f"{rng.randint(1, 99999):,}.{rng.randint(0, 99):02d}", fill="black", font=font)
+        draw.text(
+            (330, 1150),
+            f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2025",
+            fill="black",
+            font=font
+        )
+
+        path = os.path.abspath(os.path.join(out_dir, f"synthetic_{i:04d}.png"))
+        img.save(path)
+        images.append(path)
+
+    return images
+
+
+# --------------------
+# Runner
+# --------------------
+def build_job(job_id: str, image_path: str, callback_url: str) -> dict:
+    """
+    message เดียวกับ QueueService.publishOcrJob
+    """
+    return {
+        "job_id": job_id,
+        "image_path": image_path,
+        "callback_url": callback_url,
+        "slipId": job_id,
+        "userId": "loadtest",
+        "trace_id": uuid.uuid4().hex,
+        "enqueued_at": time.time(),
+    }
+
+
+def run_load(args) -> dict:
+    rng = random.Random(args.seed)
+    run_id = uuid.uuid4().hex[:8]
+
+    if args.corpus:
+        images = load_corpus(args.corpus)
+        if not images:
+            raise SystemExit(f"No images found in {args.corpus}")
+    else:
+        images = make_synthetic(args.synthetic_dir, args.synthetic_count, rng, args.font)
+
+    sink = CallbackSink(args.sink_host, args.sink_port)
+    sink.start()
+    callback_url = f"http://{args.callback_host}:{sink.port}/callback/ocr"
+
+    client = redis.Redis(host=args.redis_host, port=args.redis_port, decode_responses=True)
+    client.ping()
+
+    sampler = ResourceSampler(args.worker_pid, args.sample_interval) if args.worker_pid else None
+    if sampler:
+        sampler.start()
+
+    published = {}
+    no_subscriber = 0
+    started = time.time()
+    next_at = started
+    i = 0
+
+    print(f"🟢 Load test {run_id} | images={len(images)} callback={callback_url}")
+
+    def expired():
+        return bool(args.duration) and time.time() - started >= args.duration
+
+    stalled = False
+
+    while not expired() and not (args.jobs and i >= args.jobs):
+        if args.concurrency:
+            # closed-loop: รอจนงานค้างน้อยกว่า concurrency
+            # (ถ้าไม่มี callback กลับมาเลยนาน drain_timeout ถือว่า worker ค้าง หยุด run)
+            waited_since = time.time()
+            while i - sink.count() >= args.concurrency and not expired():
+                before = sink.count()
+                sink.wait_for(before + 1, timeout=1)
+                if sink.count() > before:
+                    waited_since = time.time()
+                elif time.time() - waited_since > args.drain_timeout:
+                    stalled = True
+                    break
+            if expired() or stalled:
+                break
+        else:
+            # open-loop: publish ตาม rate (คงที่ หรือ poisson)
+            gap = rng.expovariate(args.rate) if args.poisson else 1 / args.rate
+            next_at += gap
+            delay = next_at - time.time()
+            if delay > 0:
+                time.sleep(delay)
+
+        job_id = f"{JOB_PREFIX}{run_id}-{i:06d}"
+        job = build_job(job_id, rng.choice(images), callback_url)
+
+        published[job_id] = time.time()
+        if client.publish(args.channel, json.dumps(job)) == 0:
+            no_subscriber += 1
+        i += 1
+
+    publish_done = time.time()
+    sink.wait_for(len(published), timeout=args.drain_timeout)
+    finished = time.time()
+
+    if sampler:
+        sampler.stop()
+    sink.stop()
+
+    dead_lettered = clear_dead_letters(client, published)
+
+    report = build_report(args, run_id, published, sink, no_subscriber, started, publish_done, finished, sampler)
+    report["stalled"] = stalled
+    report["dead_lettered"] = dead_lettered
+    return report
+
+
+def clear_dead_letters(client, job_ids) -> int:
+    """
+    ลบ job ของ run นี้ออกจาก dead-letter store (entry + retry schedule)
+    คืนจำนวน job ที่ถูก dead-letter ไว้
+
+    job ที่ยังไม่จบหลัง --drain-timeout อาจถูก dead-letter หลังจากนี้ (จะหมดอายุตาม DLQ_TTL)
+    """
+    job_ids = list(job_ids)
+    if not job_ids:
+        return 0
+
+    pipe = client.pipeline()
+    for job_id in job_ids:
+        pipe.delete(DLQ_ENTRY_KEY.format(job_id))
+    deleted = sum(pipe.execute())
+
+    client.zrem(DLQ_INDEX_KEY, *job_ids)
+    client.zrem(DLQ_RETRY_KEY, *job_ids)
+
+    if deleted:
+        print(f"🧹 Removed {deleted} load-test job(s) from the dead-letter store")
+    return deleted
+
+
+def build_report(args, run_id, published, sink, no_subscriber, started, publish_done, finished, sampler) -> dict:
+    latencies = []
+    queue_waits = []
+    pool_waits = []
+    service_times = []
+    statuses = {}
+    last_received = started
+
+    for job_id, sent_at in published.items():
+        entry = sink.received.get(job_id)
+        if entry is None:
+            continue
+        latencies.append(entry["received_at"] - sent_at)
+        statuses[entry["status"]] = statuses.get(entry["status"], 0) + 1
+        last_received = max(last_received, entry["received_at"])
+
+        trace = entry["payload"].get("trace") or {}
+        if trace.get("queueWaitSeconds") is not None:
+            queue_waits.append(trace["queueWaitSeconds"])
+        if trace.get("poolWaitSeconds") is not None:
+            pool_waits.append(trace["poolWaitSeconds"])
+        if trace.get("serviceSeconds") is not None:
+            service_times.append(trace["serviceSeconds"])
+
+    completed = len(latencies)
+    window = max(last_received - started, 1e-9)
+
+    def pct(p, values=latencies):
+        value = percentile(values, p)
+        return round(value, 3) if value is not None else None
+
+    return {
+        "run_id": run_id,
+        "label": args.label,
+        "config": {
+            "mode": "concurrency" if args.concurrency else ("poisson" if args.poisson else "rate"),
+            "rate": args.rate,
+            "concurrency": args.concurrency,
+            "jobs": args.jobs,
+            "duration": args.duration,
+            "seed": args.seed,
+            "corpus": args.corpus,
+            "channel": args.channel,
+        },
+        "published": len(published),
+        "completed": completed,
+        "lost": len(published) - completed,
+        "no_subscriber": no_subscriber,
+        "duplicate_callbacks": sink.duplicates,
+        "statuses": statuses,
+        "publish_seconds": round(publish_done - started, 2),
+        "total_seconds": round(finished - started, 2),
+        "throughput_per_s": round(completed / window, 3),
+        "latency_seconds": {
+            "min": round(min(latencies), 3) if latencies else None,
+            "p50": pct(50),
+            "p90": pct(90),
+            "p95": pct(95),
+            "p99": pct(99),
+            "max": round(max(latencies), 3) if latencies else None,
+            "mean": round(sum(latencies) / completed, 3) if latencies else None,
+        },
+        # จาก trace ใน callback: รอใน Redis / รอ process ว่าง vs เวลาทำงานจริงใน OCR process
+        "queue_wait_seconds": {
+            "p50": pct(50, queue_waits),
+            "p95": pct(95, queue_waits),
+            "max": round(max(queue_waits), 3) if queue_waits else None,
+        },
+        "pool_wait_seconds": {
+            "p50": pct(50, pool_waits),
+            "p95": pct(95, pool_waits),
+            "max": round(max(pool_waits), 3) if pool_waits else None,
+        },
+        "service_seconds": {
+            "p50": pct(50, service_times),
+            "p95": pct(95, service_times),
+            "max": round(max(service_times), 3) if service_times else None,
+        },
+        "worker_resources": sampler.samples if sampler else [],
+    }
+
+
+def _positive_float(value: str) -> float:
+    number = float(value)
+    if not number > 0:
+        raise argparse.ArgumentTypeError(f"must be > 0, got {value}")
+    return number
+
+
+def _positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be >= 1, got {number}")
+    return number
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="End-to-end load test for the OCR worker")
+
+    load = parser.add_mutually_exclusive_group(required=True)
+    load.add_argument("--rate", type=_positive_float, help="open-loop jobs per second")
+    load.add_argument("--concurrency", type=_positive_int, help="closed-loop: jobs kept in flight")
+
+    parser.add_argument("--poisson", action="store_true", help="poisson arrivals for --rate")
+    parser.add_argument("--jobs", type=int, help="stop after N jobs")
+    parser.add_argument("--duration", type=float, help="stop publishing after N seconds")
+    parser.add_argument(
+        "--drain-timeout", type=float, default=120,
+        help="seconds to wait for callbacks after publishing"
+    )
+    parser.add_argument("--seed", type=int, default=42, help="seed for image order / arrivals / synthetic slips")
+    parser.add_argument("--label", default="", help="free-form label stored in the report (e.g. pool size)")
+
+    parser.add_argument("--corpus", help="directory of real slip images (must be readable by the worker)")
+    parser.add_argument("--synthetic-dir", default="logs/loadtest/images", help="where synthetic slips are written")
+    parser.add_argument("--synthetic-count", type=int, default=20, help="number of distinct synthetic slips")
+    parser.add_argument("--font", help="Thai TTF font for synthetic slips (default: first installed Thai font)")
+
+    parser.add_argument("--redis-host", default=REDIS_HOST)
+    parser.add_argument("--redis-port", type=int, default=REDIS_PORT)
+    parser.add_argument("--channel", default=REDIS_CHANNEL)
+
+    parser.add_argument("--sink-host", default="0.0.0.0", help="callback sink bind address")
+    parser.add_argument("--sink-port", type=int, default=0, help="callback sink port (0 = random)")
+    parser.add_argument("--callback-host", default="localhost", help="host the worker uses to reach the sink")
+
+    parser.add_argument("--worker-pid", type=int, help="worker pid to sample CPU / RSS (includes child processes)")
+    parser.add_argument("--sample-interval", type=float, default=1.0)
+    parser.add_argument("--report", help="write the JSON report to this file")
+
+    args = parser.parse_args(argv)
+
+    if not args.jobs and not args.duration:
+        parser.error("--jobs or --duration is required")
+
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = run_load(args)
+
+    summary = {k: v for k, v in report.items() if k != "worker_resources"}
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"📝 Report written to {args.report}")
+
+    return 0 if report["lost"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+import hashlib
+import json
+import os
+import tempfile
+
+from config import RESULT_CACHE_DIR
+from src.utils.logger import to_json_safe
+
+# เปลี่ยนค่านี้เมื่อ preprocessing / OCR engine เปลี่ยน เพื่อไม่ให้ใช้ผลเก่า
+# (parser / zones ไม่อยู่ใน key: ผลที่ cache คือ OCR words ก่อน parse)
+OCR_CACHE_VERSION = "easyocr-th-en-v1"
+
+
+def image_key(path: str) -> str:
+    """
+    key ของรูป = sha256 ของเนื้อไฟล์ + OCR_CACHE_VERSION
+    """
+    digest = hashlib.sha256()
+    digest.update(OCR_CACHE_VERSION.encode("utf-8"))
+
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+class OcrResultCache:
+    """
+    On-disk cache ของผล OCR (words + ขนาดรูปหลัง preprocess)
+
+    ใช้ตอน re-extract สลิปเก่า: ถ้า parser หรือ zones เปลี่ยน
+    ไม่ต้องรัน EasyOCR ใหม่ แค่ parse จาก words ที่ cache ไว้
+    """
+
+    def __init__(self, base_dir: str = RESULT_CACHE_DIR):
+        self.base_dir = base_dir
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.base_dir, key[:2], f"{key}.json")
+
+    def get(self, key: str):
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def put(self, key: str, value: dict):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # เขียนไฟล์ชั่วคราวแล้ว rename เพื่อไม่ให้ process อื่นอ่านเจอไฟล์ครึ่ง ๆ
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(to_json_safe(value), f, ensure_ascii=False)
+        os.replace(tmp_path, path)
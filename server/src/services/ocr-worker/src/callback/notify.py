@@ -13,7 +13,8 @@ def send_ocr_result(
     status: str,
     extracted_data: dict,
     max_retry: int = 5,
-    timeout: int = 10
+    timeout: int = 10,
+    trace: dict = None
 ):
     """
     ส่งผล OCR ไปยัง main API
@@ -23,6 +24,9 @@ def send_ocr_result(
     - slip_id: id ของสลิป
     - status: success | failed
     - extracted_data: ข้อมูลที่ parse แล้ว
+    - trace: traceId + spans ของ job (optional)
+      แต่ละ attempt แนบ attempt + sinceFirstAttemptSeconds ไปด้วย
+      (ฝั่ง API แยกเวลาที่เสียไปกับ callback retry ออกจาก latency ของ OCR ได้)
     """
 
     payload = {
@@ -31,7 +35,16 @@ def send_ocr_result(
         "data": extracted_data
     }
 
+    first_attempt_at = time.time()
+
     for attempt in range(1, max_retry + 1):
+        if trace is not None:
+            payload["trace"] = {
+                **trace,
+                "attempt": attempt,
+                "sinceFirstAttemptSeconds": round(time.time() - first_attempt_at, 4),
+            }
+
         try:
             response = requests.post(
                 callback_url,
@@ -0,0 +1,78 @@
+import threading
+
+# --------------------
+# In-process metrics registry
+# --------------------
+# เก็บ gauge / counter แบบง่าย ๆ แล้ว export เป็น Prometheus text format
+# ที่ endpoint /metrics (ไม่ต้องพึ่ง prometheus_client)
+
+_lock = threading.Lock()
+_gauges = {}
+_counters = {}
+_help = {}
+
+
+def _key(name, labels):
+    return name, tuple(sorted((labels or {}).items()))
+
+
+def set_gauge(name: str, value: float, labels: dict = None, help_text: str = None):
+    with _lock:
+        _gauges[_key(name, labels)] = float(value)
+        if help_text:
+            _help[name] = help_text
+
+
+def inc_counter(name: str, amount: float = 1, labels: dict = None, help_text: str = None):
+    with _lock:
+        key = _key(name, labels)
+        _counters[key] = _counters.get(key, 0.0) + amount
+        if help_text:
+            _help[name] = help_text
+
+
+def snapshot() -> dict:
+    """
+    คืนค่า metrics ทั้งหมดเป็น dict (ใช้ debug / JSON)
+    """
+    with _lock:
+        items = list(_gauges.items()) + list(_counters.items())
+
+    result = {}
+    for (name, labels), value in items:
+        if labels:
+            label_txt = ",".join(f"{k}={v}" for k, v in labels)
+            result[f"{name}{{{label_txt}}}"] = value
+        else:
+            result[name] = value
+    return result
+
+
+def render_prometheus() -> str:
+    """
+    แปลง metrics เป็น Prometheus exposition format
+    """
+    with _lock:
+        series = (
+            [("gauge", k, v) for k, v in _gauges.items()]
+            + [("counter", k, v) for k, v in _counters.items()]
+        )
+        help_texts = dict(_help)
+
+    lines = []
+    seen = set()
+
+    for kind, (name, labels), value in sorted(series, key=lambda s: s[1]):
+        if name not in seen:
+            seen.add(name)
+            if name in help_texts:
+                lines.append(f"# HELP {name} {help_texts[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        if labels:
+            label_txt = ",".join(f'{k}="{v}"' for k, v in labels)
+            lines.append(f"{name}{{{label_txt}}} {value}")
+        else:
+            lines.append(f"{name} {value}")
+
+    return "\n".join(lines) + "\n"
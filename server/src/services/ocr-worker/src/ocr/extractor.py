@@ -1,11 +1,122 @@
+import os
+
 import easyocr
 import numpy as np
+from easyocr.config import MODULE_PATH, detection_models, recognition_models
+from easyocr.utils import calculate_md5, download_and_unzip, reformat_input
+
+from src.ocr.recognition_cache import RecognitionCache, crop_hash
+
+# init reader ครั้งเดียวต่อ process (สำคัญมาก)
+# สร้างแบบ lazy เพื่อไม่ให้ process หลัก (ที่ไม่ได้ทำ OCR) โหลดโมเดลโดยเปล่าประโยชน์
+_reader = None
+
+# cache ผล recognition ของ text-line ที่เจอซ้ำ (label คงที่ของแต่ละ layout)
+recognition_cache = RecognitionCache()
+
+# โมเดลที่ Reader(['th', 'en']) ใช้: CRAFT detector + recognizer ภาษาไทย (รองรับอังกฤษด้วย)
+_MODELS = (detection_models["craft"], recognition_models["gen1"]["thai_g1"])
+
+
+def _new_reader():
+    return easyocr.Reader(
+        ['th', 'en'],
+        gpu=False
+    )
+
+
+def get_reader():
+    """
+    คืน EasyOCR reader ของ process นี้ (สร้างครั้งแรกที่ถูกเรียก)
+    """
+    global _reader
+
+    if _reader is None:
+        _reader = _new_reader()
+
+    return _reader
+
+
+def download_models():
+    """
+    ดาวน์โหลด / ตรวจ md5 ของโมเดลครั้งเดียวใน process หลัก ก่อน spawn OCR processes
+    (กันหลาย process ดาวน์โหลดลง ~/.EasyOCR พร้อมกันระหว่างทำ job)
+
+    ดาวน์โหลดอย่างเดียว ไม่สร้าง Reader: process หลักไม่ได้ทำ OCR จึงไม่ควรถือโมเดลไว้ใน memory
+    """
+    model_dir = os.path.join(MODULE_PATH, "model")
+    os.makedirs(model_dir, exist_ok=True)
+
+    for model in _MODELS:
+        path = os.path.join(model_dir, model["filename"])
+        if os.path.isfile(path) and calculate_md5(path) == model["md5sum"]:
+            continue
+
+        print(f"⬇️ Downloading EasyOCR model {model['filename']}")
+        download_and_unzip(model["url"], model["filename"], model_dir, verbose=False)
+
+
+def _clip_box(box, max_x, max_y):
+    """
+    clip horizontal box [x_min, x_max, y_min, y_max] แบบเดียวกับ easyocr.utils.get_image_list
+    """
+    return max(0, box[0]), min(box[1], max_x), max(0, box[2]), min(box[3], max_y)
+
+
+def _readtext_cached(image):
+    """
+    เทียบเท่า reader.readtext(image) แต่แยก detect / recognize
+    แล้วข้าม recognizer สำหรับ text-line ที่เคย recognize แล้ว
+    """
+    reader = get_reader()
+    img, img_cv_grey = reformat_input(image)
+
+    horizontal_list, free_list = reader.detect(img, reformat=False)
+    horizontal_list, free_list = horizontal_list[0], free_list[0]
+
+    max_y, max_x = img_cv_grey.shape
+    found = {}
+    misses = []
+    keys = {}
+
+    for box in horizontal_list:
+        x_min, x_max, y_min, y_max = _clip_box(box, max_x, max_y)
+        if x_max <= x_min or y_max <= y_min:
+            continue
+
+        key = crop_hash(img_cv_grey[y_min:y_max, x_min:x_max])
+        coords = (x_min, y_min, x_max, y_max)
+        keys[coords] = key
+
+        cached = recognition_cache.get(key)
+        if cached is None:
+            misses.append(box)
+        else:
+            text, conf = cached
+            found[coords] = ([[x_min, y_min], [x_max, y_min], [x_max, y_max], [x_min, y_max]], text, conf)
+
+    free_results = []
+    if misses or free_list:
+        recognized = reader.recognize(img_cv_grey, misses, free_list, reformat=False)
+
+        for bbox, text, conf in recognized:
+            coords = (bbox[0][0], bbox[0][1], bbox[2][0], bbox[2][1])
+            if coords in keys and coords not in found:
+                found[coords] = (bbox, text, conf)
+                recognition_cache.put(keys[coords], text, conf)
+            else:
+                free_results.append((bbox, text, conf))
+
+    # ลำดับเดียวกับ readtext บน CPU: horizontal ตาม detect แล้วตามด้วย free
+    results = []
+    for box in horizontal_list:
+        x_min, x_max, y_min, y_max = _clip_box(box, max_x, max_y)
+        result = found.get((x_min, y_min, x_max, y_max))
+        if result is not None:
+            results.append(result)
+
+    return results + free_results
 
-# init reader ครั้งเดียว (สำคัญมาก)
-reader = easyocr.Reader(
-    ['th', 'en'],
-    gpu=False
-)
 
 def extract_text_with_log(image):
     """
@@ -13,7 +124,10 @@ def extract_text_with_log(image):
     คืน text + confidence + bbox
     """
 
-    results = reader.readtext(image)
+    if recognition_cache.enabled:
+        results = _readtext_cached(image)
+    else:
+        results = get_reader().readtext(image)
 
     words = []
     confidences = []
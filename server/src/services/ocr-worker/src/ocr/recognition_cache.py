@@ -0,0 +1,127 @@
+import math
+import re
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+from config import RECOG_CACHE_SIZE, RECOG_CACHE_MAX_DISTANCE
+
+# dHash grid: 8 แถว × 32 คู่ pixel ที่ติดกัน = 256 bits ต่อ crop
+_HASH_ROWS = 8
+_HASH_COLS = 32
+
+# อัตราส่วน กว้าง/สูง แบ่งเป็นช่วงละ ~10% (crop ต่างความยาวไม่ถูกเทียบกัน)
+_ASPECT_STEP = math.log(1.1)
+
+_DIGIT_RE = re.compile(r"[0-9๐-๙]")
+
+
+def crop_hash(crop) -> tuple:
+    """
+    Perceptual hash (dHash) ของ text-line crop → (aspect bucket, 256-bit int)
+
+    ย่อเป็น grid คงที่ 8×33 แล้วเทียบความสว่างของ pixel ที่ติดกันในแถว
+    ได้ bit ที่ทนต่อ scale / contrast / noise เล็กน้อย (เทียบด้วย Hamming distance)
+    """
+    h, w = crop.shape[:2]
+    bucket = round(math.log(max(w, 1) / max(h, 1)) / _ASPECT_STEP)
+
+    small = cv2.resize(crop, (_HASH_COLS + 1, _HASH_ROWS), interpolation=cv2.INTER_AREA).astype(np.int16)
+    # ต่างกันน้อยกว่า ~5% ของ contrast ถือว่าเท่ากัน: พื้นที่ว่างไม่พลิก bit ตาม noise
+    margin = max(int(small.max() - small.min()) // 20, 2)
+    bits = np.packbits(small[:, 1:] - small[:, :-1] > margin)
+
+    return bucket, int.from_bytes(bits.tobytes(), "big")
+
+
+def is_cacheable(text: str) -> bool:
+    """
+    cache เฉพาะข้อความที่ไม่มีตัวเลข (header, caption, ชื่อธนาคาร)
+    จำนวนเงิน / วันที่ / เลขบัญชีต่างกันแค่ไม่กี่ pixel ไม่ควรเสี่ยงใช้ผลจาก cache
+    """
+    return bool(text.strip()) and not _DIGIT_RE.search(text)
+
+
+class RecognitionCache:
+    """
+    LRU cache: crop hash → (text, confidence) ภายใน OCR process
+
+    get() เจอเมื่อมี entry ใน aspect bucket เดียวกัน (หรือติดกัน) ที่ Hamming distance
+    ไม่เกิน max_distance: crop ของ label เดียวกันจากสลิปคนละใบไม่ได้ตรงกันทุก pixel
+
+    hit / miss นับเฉพาะบรรทัดที่ cache ได้ (ไม่มีตัวเลข)
+    บรรทัดที่มีตัวเลขนับแยกเป็น uncacheable ไม่ให้ hit_ratio ต่ำเพราะโครงสร้าง
+    """
+
+    def __init__(self, max_size: int = RECOG_CACHE_SIZE, max_distance: int = RECOG_CACHE_MAX_DISTANCE):
+        self.max_size = max_size
+        self.max_distance = max_distance
+        self._entries = OrderedDict()
+        # aspect bucket → hashes ใน bucket นั้น (scan เฉพาะ bucket ที่ใกล้กัน)
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.uncacheable = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def _nearest_locked(self, key: tuple):
+        if key in self._entries:
+            return key
+
+        bucket, bits = key
+        best, best_distance = None, self.max_distance + 1
+        for near in (bucket, bucket - 1, bucket + 1):
+            for other in self._buckets.get(near, ()):
+                distance = (bits ^ other).bit_count()
+                if distance < best_distance:
+                    best, best_distance = (near, other), distance
+        return best
+
+    def get(self, key: tuple):
+        with self._lock:
+            match = self._nearest_locked(key)
+            if match is None:
+                # นับ miss ตอน put เมื่อรู้แล้วว่าบรรทัดนี้ cache ได้หรือไม่
+                return None
+
+            self._entries.move_to_end(match)
+            self.hits += 1
+            return self._entries[match]
+
+    def put(self, key: tuple, text: str, confidence: float):
+        """
+        เก็บผล recognition ของ crop ที่ get ไม่เจอ
+        """
+        if not is_cacheable(text):
+            with self._lock:
+                self.uncacheable += 1
+            return
+
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = (text, confidence)
+            self._entries.move_to_end(key)
+            self._buckets.setdefault(key[0], set()).add(key[1])
+
+            while len(self._entries) > self.max_size:
+                (bucket, bits), _ = self._entries.popitem(last=False)
+                self._buckets[bucket].discard(bits)
+                if not self._buckets[bucket]:
+                    del self._buckets[bucket]
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "uncacheable": self.uncacheable,
+                "entries": len(self._entries),
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,165 @@
+import re
+from datetime import date
+from functools import lru_cache
+
+# --------------------
+# Precompiled tables
+# --------------------
+_THAI_DIGITS_TRANS = str.maketrans(
+    '๐๑๒๓๔๕๖๗๘๙',
+    '0123456789'
+)
+
+# key = ชื่อเดือนที่ตัด . และช่องว่างออกแล้ว (OCR มักทำจุดหาย / เว้นวรรคเกิน)
+_MONTHS = {}
+
+for _month, _names in enumerate([
+    ('มค', 'มกราคม', 'jan', 'january'),
+    ('กพ', 'กุมภาพันธ์', 'feb', 'february'),
+    ('มีค', 'มีนาคม', 'mar', 'march'),
+    ('เมย', 'เมษายน', 'apr', 'april'),
+    ('พค', 'พฤษภาคม', 'may'),
+    ('มิย', 'มิถุนายน', 'jun', 'june'),
+    ('กค', 'กรกฎาคม', 'jul', 'july'),
+    ('สค', 'สิงหาคม', 'aug', 'august'),
+    ('กย', 'กันยายน', 'sep', 'sept', 'september'),
+    ('ตค', 'ตุลาคม', 'oct', 'october'),
+    ('พย', 'พฤศจิกายน', 'nov', 'november'),
+    ('ธค', 'ธันวาคม', 'dec', 'december'),
+], start=1):
+    for _name in _names:
+        _MONTHS[_name] = _month
+
+_MONTH_STRIP_RE = re.compile(r"[\s.]+")
+
+# ชื่อเดือนที่รู้จักเท่านั้น (ยอมให้มี . / ช่องว่างแทรกระหว่างตัวอักษร) ยาวก่อนสั้น
+# ข้อความที่แค่หน้าตาคล้ายวันที่ (เช่น "05 น. 01") จะไม่ match และไม่กินวันที่จริงที่ตามมา
+_MONTH_PATTERN = "|".join(
+    r"[.\s]*".join(re.escape(ch) for ch in name)
+    for name in sorted(_MONTHS, key=len, reverse=True)
+)
+
+# token ทั้งหมดของวันที่ใน regex เดียว (scan ครั้งเดียวต่อ string)
+_DATE_RE = re.compile(
+    r"""
+    (?<!\d)(?P<td>\d{1,2})\s*(?P<tm>(?:""" + _MONTH_PATTERN + r"""))\.?\s*(?P<ty>\d{4}|\d{2})(?!\d)
+    | (?<!\d)(?P<a>\d{1,4})\s*[/\-.]\s*(?P<b>\d{1,2})\s*[/\-.]\s*(?P<c>\d{4}|\d{2})(?!\d)
+    | (?<!\d)(?P<compact>\d{8})(?!\d)
+    """,
+    re.VERBOSE | re.IGNORECASE
+)
+
+_CURRENCY_RE = re.compile(r"บาท|฿|THB", re.IGNORECASE)
+
+# จำนวนเงิน: หลักพันคั่นด้วย , / ทศนิยม 1-2 หลักด้วย . หรือ ,
+# ช่องว่างไม่นับเป็นตัวคั่นหลักพัน: "5 100.00" คือตัวเลข 2 ตัว (ใช้ตัวแรก) ไม่ใช่ 5100
+_AMOUNT_RE = re.compile(
+    r"(?<![\d])(?P<int>\d{1,3}(?:,\d{3})+|\d+)(?:\s*[.,]\s*(?P<dec>\d{1,2}))?(?!\d)"
+)
+
+_DAYS_IN_MONTH = (31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+# ปี พ.ศ. 4 หลักเริ่มที่ค่านี้ (พ.ศ. 2400 = ค.ศ. 1857)
+_BE_THRESHOLD = 2400
+_BE_OFFSET = 543
+
+
+def _to_ascii_digits(s: str) -> str:
+    if not s:
+        return s
+    return s.translate(_THAI_DIGITS_TRANS)
+
+
+def _full_year(year_txt: str) -> int:
+    """
+    แปลงปีเป็น ค.ศ. 4 หลัก
+
+    - 4 หลัก >= 2400 → พ.ศ.
+    - 2 หลัก → ค.ศ. 20xx ถ้าไม่เกินปีหน้า ไม่งั้นถือเป็น พ.ศ. 25xx (เช่น 68 → 2568 → 2025)
+    """
+    year = int(year_txt)
+
+    if len(year_txt) == 2:
+        ce = 2000 + year
+        if ce <= date.today().year + 1:
+            return ce
+        return 2500 + year - _BE_OFFSET
+
+    if year >= _BE_THRESHOLD:
+        return year - _BE_OFFSET
+    return year
+
+
+def _valid(y: int, m: int, d: int) -> bool:
+    if not (1 <= m <= 12 and 1 <= d <= _DAYS_IN_MONTH[m - 1] and 1900 <= y <= 2200):
+        return False
+    # 29 ก.พ. เฉพาะปีอธิกสุรทิน
+    if m == 2 and d == 29:
+        return y % 4 == 0 and (y % 100 != 0 or y % 400 == 0)
+    return True
+
+
+def _match_to_date(m):
+    if m.group("td"):
+        month = _MONTHS.get(_MONTH_STRIP_RE.sub("", m.group("tm")).lower())
+        if month is None:
+            return None
+        return _full_year(m.group("ty")), month, int(m.group("td"))
+
+    if m.group("a"):
+        a, b, c = m.group("a"), m.group("b"), m.group("c")
+        if len(a) == 4:
+            # YYYY-MM-DD
+            return _full_year(a), int(b), int(c)
+        # DD/MM/YYYY (รูปแบบไทย)
+        return _full_year(c), int(b), int(a)
+
+    v = m.group("compact")
+    return _full_year(v[:4]), int(v[4:6]), int(v[6:])
+
+
+@lru_cache(maxsize=4096)
+def normalize_date(date_str: str) -> str | None:
+    """Normalize a free-form OCR date string to ISO 8601 (YYYY-MM-DD).
+
+    Single regex scan; handles Thai digits, Thai short / full month names,
+    Buddhist-era years and common separators. Returns None if no valid date.
+    A rejected match is rescanned from its next character, so it never hides
+    a real date that overlaps it.
+    """
+    if not date_str:
+        return None
+
+    s = _to_ascii_digits(date_str).replace('\u200b', '')
+
+    m = _DATE_RE.search(s)
+    while m:
+        parts = _match_to_date(m)
+        if parts and _valid(*parts):
+            y, mo, d = parts
+            return f"{y:04d}-{mo:02d}-{d:02d}"
+        m = _DATE_RE.search(s, m.start() + 1)
+
+    return None
+
+
+@lru_cache(maxsize=4096)
+def normalize_amount(amount_str: str) -> float | None:
+    """Normalize OCR amount string to float.
+
+    Handles Thai digits, comma thousand separators, decimal point or
+    comma, and currency words. Returns float or None on failure.
+    """
+    if not amount_str:
+        return None
+
+    s = _CURRENCY_RE.sub(' ', _to_ascii_digits(amount_str))
+
+    m = _AMOUNT_RE.search(s)
+    if not m:
+        return None
+
+    integer = m.group("int").replace(',', '')
+    decimal = m.group("dec")
+
+    return float(f"{integer}.{decimal}" if decimal else integer)
@@ -0,0 +1,81 @@
+from src.preprocessing.image import preprocess_image
+from src.ocr.extractor import extract_text_with_log
+from src.parser.slip_parser import parse_bill_slip
+from src.cache.result_cache import image_key
+from src.utils.logger import log_ocr_result
+from src.profiling.stages import stage
+
+
+def run_slip_pipeline(
+    image_path: str,
+    job_id: str = None,
+    log_artifacts: bool = True,
+    cache=None,
+    timer=None
+) -> dict:
+    """
+    preprocess → OCR → parse สำหรับสลิป 1 ใบ
+
+    Parameters:
+    - image_path: path ของรูปสลิป
+    - job_id: id ของงาน (ใช้เป็น transactionId และชื่อไฟล์ log)
+    - log_artifacts: เก็บรูป / ผล OCR ลง logs/ (ปิดได้ตอน backfill)
+    - cache: OcrResultCache (optional) ถ้ามี จะข้าม preprocess + OCR เมื่อเคยทำแล้ว
+    - timer: StageTimer (optional) สำหรับจับเวลาแต่ละ stage
+
+    Returns: {"ocr": ..., "parsed": ..., "cached": bool}
+    """
+    log_id = job_id if log_artifacts else None
+
+    key, entry = None, None
+    if cache is not None:
+        with stage(timer, "cache_lookup"):
+            key = image_key(image_path)
+            entry = cache.get(key)
+    cached = entry is not None
+
+    if entry is None:
+        with stage(timer, "preprocess"):
+            image = preprocess_image(image_path, log_id)
+        h, w = image.shape[:2]
+
+        with stage(timer, "ocr"):
+            ocr_result = extract_text_with_log(image)
+
+        entry = {
+            "width": w,
+            "height": h,
+            "ocr": ocr_result,
+        }
+
+        if cache is not None:
+            cache.put(key, entry)
+
+    ocr_result = entry["ocr"]
+
+    with stage(timer, "parse"):
+        parsed = parse_bill_slip(
+            words=ocr_result["words"],
+            image_width=entry["width"],
+            image_height=entry["height"]
+        )
+
+    # Inject missing fields for Frontend compatibility
+    if isinstance(parsed, dict):
+        parsed["confidence"] = ocr_result.get("confidence_avg", 0)
+        parsed["rawText"] = ocr_result.get("raw_text", "")
+        parsed["transactionId"] = job_id  # Use job_id as transactionId
+
+    if log_id:
+        log_ocr_result(job_id, {
+            "job_id": job_id,
+            "image_path": image_path,
+            "ocr": ocr_result,
+            "parsed": parsed
+        })
+
+    return {
+        "ocr": ocr_result,
+        "parsed": parsed,
+        "cached": cached,
+    }
@@ -1,8 +1,14 @@
+import os
 import cv2
 import numpy as np
 from src.utils.logger import log_image
 
 
+class ImageDecodeError(ValueError):
+    """ไฟล์มีอยู่ แต่ decode เป็นรูปไม่ได้ (ไฟล์เสีย / ไม่ใช่รูป)"""
+    pass
+
+
 def preprocess_image(path: str, job_id: str = None):
     """
     Preprocess image for OCR (Thai + Number friendly)
@@ -16,7 +22,9 @@ def preprocess_image(path: str, job_id: str = None):
     img = cv2.imread(path)
 
     if img is None:
-        raise FileNotFoundError(f"Image not found: {path}")
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Image not found: {path}")
+        raise ImageDecodeError(f"Cannot decode image: {path}")
 
     if job_id:
         log_image(job_id, img, "original")
@@ -0,0 +1 @@
+# profiling package
@@ -0,0 +1,303 @@
+import cProfile
+import glob
+import io
+import json
+import os
+import pstats
+import random
+import shutil
+import time
+import uuid
+from contextlib import contextmanager
+
+from config import (
+    PROFILE_DIR,
+    SLOW_JOB_THRESHOLD,
+    SLOW_JOB_SAMPLE_INTERVAL,
+    SLOW_JOB_PROFILE_RATE,
+    PROFILE_MAX_SLOW,
+    PROFILE_MAX_SECONDS,
+    OCR_JOB_TIMEOUT,
+)
+from src.profiling.sampler import StackSampler, format_folded
+
+# capture ที่ admin สั่งจะประกาศผ่านไฟล์นี้ เพื่อให้ทุก OCR process (spawn) เห็น
+CAPTURE_DIR = os.path.join(PROFILE_DIR, "capture")
+ACTIVE_CAPTURE_FILE = os.path.join(CAPTURE_DIR, "active.json")
+SLOW_DIR = os.path.join(PROFILE_DIR, "slow")
+# snapshot ของ job ที่กำลังช้าอยู่ ต่อ OCR process (pool ใช้เมื่อ kill job ที่เกิน timeout)
+RUNNING_DIR = os.path.join(PROFILE_DIR, "running")
+
+# เริ่มเขียน snapshot เมื่อ job ช้าแล้ว หรือใกล้ถูก kill (ถ้า timeout สั้นกว่า threshold)
+SNAPSHOT_AFTER = min(SLOW_JOB_THRESHOLD, OCR_JOB_TIMEOUT / 2) if OCR_JOB_TIMEOUT > 0 else SLOW_JOB_THRESHOLD
+
+
+class CaptureBusyError(Exception):
+    """มี capture อื่นกำลังทำงานอยู่"""
+    pass
+
+
+def _active_capture():
+    try:
+        with open(ACTIVE_CAPTURE_FILE, "r", encoding="utf-8") as f:
+            capture = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+    if time.time() > capture["until"]:
+        return None
+    return capture
+
+
+def _safe_name(job_id) -> str:
+    return "".join(c if c.isalnum() or c in "-_" else "_" for c in str(job_id))
+
+
+def _write_json(path, data):
+    # เขียนแล้ว rename: pool อ่านได้ระหว่างที่ process ยังเขียนอยู่โดยไม่เจอไฟล์ครึ่ง ๆ
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _running_path(pid) -> str:
+    return os.path.join(RUNNING_DIR, f"{pid}.json")
+
+
+# --------------------
+# Worker side
+# --------------------
+@contextmanager
+def profile_job(job_id, timer):
+    """
+    Profile 1 job
+
+    - stack sampler (SLOW_JOB_SAMPLE_INTERVAL) ทำงานทุก job: overhead ต่ำพอจะเปิดตลอด
+      job ที่ช้าเกิน SNAPSHOT_AFTER จะเขียน snapshot (stage + samples) ทุกไม่กี่วินาที
+      ให้ pool เก็บไว้ได้ถ้า job ถูก kill เพราะ OCR_JOB_TIMEOUT
+    - ถ้ามี capture ที่ admin สั่งอยู่ → cProfile แล้ว dump stats ลง capture dir
+    - ถ้า job ใช้เวลาเกิน SLOW_JOB_THRESHOLD → เก็บ stage breakdown + samples
+      + cProfile เฉพาะ job ที่ถูกสุ่ม (SLOW_JOB_PROFILE_RATE) เพราะ cProfile มี overhead ทุก call
+    """
+    capture = _active_capture()
+    sampled = SLOW_JOB_PROFILE_RATE > 0 and random.random() < SLOW_JOB_PROFILE_RATE
+    profiler = cProfile.Profile() if (capture or sampled) else None
+    started = time.time()
+
+    def snapshot(sampler):
+        if time.time() - started >= SNAPSHOT_AFTER:
+            _write_snapshot(job_id, started, timer, sampler)
+
+    sampler = None
+    if SLOW_JOB_SAMPLE_INTERVAL > 0:
+        sampler = StackSampler(SLOW_JOB_SAMPLE_INTERVAL, checkpoint=snapshot).start()
+
+    if profiler:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler:
+            profiler.disable()
+        if sampler:
+            sampler.stop()
+        elapsed = time.time() - started
+
+        try:
+            if capture:
+                profiler.dump_stats(os.path.join(
+                    capture["dir"],
+                    f"{os.getpid()}_{_safe_name(job_id)}_{int(started * 1000)}.prof"
+                ))
+
+            if elapsed >= SLOW_JOB_THRESHOLD:
+                save_slow_job(
+                    job_id,
+                    elapsed,
+                    timer.breakdown() if timer else {},
+                    profiler=profiler,
+                    folded=sampler.folded() if sampler else ""
+                )
+        except Exception as e:
+            print(f"⚠️ Profile save failed for job_id={job_id}: {e}")
+        finally:
+            _discard_snapshot()
+
+
+def _write_snapshot(job_id, started: float, timer, sampler):
+    os.makedirs(RUNNING_DIR, exist_ok=True)
+    _write_json(_running_path(os.getpid()), {
+        "job_id": job_id,
+        "started": started,
+        "stages": timer.breakdown() if timer else {},
+        "running_stages": timer.running_stages() if timer else [],
+        "folded": sampler.folded(),
+    })
+
+
+def _discard_snapshot():
+    try:
+        os.remove(_running_path(os.getpid()))
+    except FileNotFoundError:
+        pass
+
+
+def save_slow_job(job_id, elapsed: float, stages: dict, profiler=None, folded: str = "", **extra):
+    """
+    เก็บ stage breakdown + samples (+ cProfile ถ้ามี) ของ job ที่ช้า (จำกัดจำนวนไฟล์)
+    """
+    os.makedirs(SLOW_DIR, exist_ok=True)
+
+    name = f"{int(time.time() * 1000)}_{_safe_name(job_id)}"
+
+    if profiler is not None:
+        profiler.dump_stats(os.path.join(SLOW_DIR, f"{name}.prof"))
+
+    if folded:
+        with open(os.path.join(SLOW_DIR, f"{name}.folded"), "w", encoding="utf-8") as f:
+            f.write(folded)
+
+    _write_json(os.path.join(SLOW_DIR, f"{name}.json"), {
+        "name": name,
+        "job_id": job_id,
+        "seconds": round(elapsed, 4),
+        "threshold": SLOW_JOB_THRESHOLD,
+        "stages": stages,
+        "has_profile": profiler is not None,
+        "has_samples": bool(folded),
+        **extra,
+    })
+
+    print(f"🐢 job_id={job_id} took {elapsed:.2f}s → profile saved ({name})")
+    _prune_slow_jobs()
+
+
+def save_killed_job(pid: int, job_id, elapsed: float):
+    """
+    เรียกจาก pool เมื่อ kill process ที่ job เกิน OCR_JOB_TIMEOUT
+
+    process ตายไปพร้อม profile_job จึงใช้ snapshot ล่าสุดที่ process นั้นเขียนไว้
+    (ไม่มี snapshot = เก็บแค่เวลาที่ pool รู้)
+    """
+    path = _running_path(pid)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            snapshot = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        snapshot = {}
+
+    if snapshot.get("job_id") != job_id:
+        snapshot = {}
+
+    save_slow_job(
+        job_id,
+        elapsed,
+        snapshot.get("stages", {}),
+        folded=snapshot.get("folded", ""),
+        killed=True,
+        running_stages=snapshot.get("running_stages", []),
+    )
+
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _prune_slow_jobs():
+    entries = sorted(glob.glob(os.path.join(SLOW_DIR, "*.json")))
+    for path in entries[:-PROFILE_MAX_SLOW] if PROFILE_MAX_SLOW > 0 else entries:
+        base = path[:-len(".json")]
+        for p in (path, f"{base}.prof", f"{base}.folded"):
+            try:
+                os.remove(p)
+            except FileNotFoundError:
+                pass
+
+
+# --------------------
+# Admin side
+# --------------------
+def format_stats(paths, sort: str = "cumulative", limit: int = 40) -> str:
+    stream = io.StringIO()
+    stats = pstats.Stats(*paths, stream=stream)
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+    return stream.getvalue()
+
+
+def run_capture(seconds: float = None, jobs: int = None, sort: str = "cumulative", limit: int = 40) -> dict:
+    """
+    เปิด capture ให้ทุก OCR process profile งานที่เริ่มในช่วงนี้
+    จนครบ seconds วินาที หรือครบ jobs งาน (แล้วแต่อย่างไหนก่อน)
+    """
+    if _active_capture():
+        raise CaptureBusyError("another profile capture is running")
+
+    timeout = min(seconds or PROFILE_MAX_SECONDS, PROFILE_MAX_SECONDS)
+    capture_id = uuid.uuid4().hex[:12]
+    capture_dir = os.path.join(CAPTURE_DIR, capture_id)
+    os.makedirs(capture_dir, exist_ok=True)
+
+    started = time.time()
+    tmp_path = f"{ACTIVE_CAPTURE_FILE}.{capture_id}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"id": capture_id, "dir": capture_dir, "until": started + timeout}, f)
+    os.replace(tmp_path, ACTIVE_CAPTURE_FILE)
+
+    try:
+        while time.time() - started < timeout:
+            if jobs and len(glob.glob(os.path.join(capture_dir, "*.prof"))) >= jobs:
+                break
+            time.sleep(0.5)
+    finally:
+        try:
+            os.remove(ACTIVE_CAPTURE_FILE)
+        except FileNotFoundError:
+            pass
+
+    paths = sorted(glob.glob(os.path.join(capture_dir, "*.prof")))
+    if jobs:
+        paths = paths[:jobs]
+
+    result = {
+        "capture_id": capture_id,
+        "seconds": round(time.time() - started, 2),
+        "jobs_profiled": len(paths),
+        "stats": format_stats(paths, sort, limit) if paths else "",
+    }
+
+    shutil.rmtree(capture_dir, ignore_errors=True)
+    return result
+
+
+def list_slow_jobs() -> list:
+    entries = []
+    for path in sorted(glob.glob(os.path.join(SLOW_DIR, "*.json")), reverse=True):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entries.append(json.load(f))
+        except (OSError, json.JSONDecodeError):
+            continue
+    return entries
+
+
+def get_slow_job(name: str, sort: str = "cumulative", limit: int = 40):
+    name = _safe_name(name)
+    path = os.path.join(SLOW_DIR, f"{name}.json")
+
+    if not os.path.exists(path):
+        return None
+
+    with open(path, "r", encoding="utf-8") as f:
+        entry = json.load(f)
+
+    prof_path = os.path.join(SLOW_DIR, f"{name}.prof")
+    entry["stats"] = format_stats([prof_path], sort, limit) if os.path.exists(prof_path) else ""
+
+    folded_path = os.path.join(SLOW_DIR, f"{name}.folded")
+    entry["samples"] = ""
+    if os.path.exists(folded_path):
+        with open(folded_path, "r", encoding="utf-8") as f:
+            entry["samples"] = format_folded(f.read(), limit)
+    return entry
@@ -0,0 +1,106 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+# stack ที่ลึกกว่านี้ตัดส่วนล่าง (ใกล้ thread entry) ทิ้ง
+MAX_DEPTH = 64
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """
+    Sampling profiler: อ่าน stack ของ thread เป้าหมายทุก interval ผ่าน sys._current_frames()
+
+    overhead คงที่ต่อ sample ไม่ขึ้นกับจำนวน function call (ต่างจาก cProfile)
+    จึงเปิดได้ทุก job โดยไม่ทำให้ job ช้าลง
+
+    ผลเป็น folded stacks ("outer;inner;leaf count") เปิดด้วย flamegraph.pl / speedscope ได้
+    checkpoint(sampler) ถูกเรียกจาก sampler thread ทุก checkpoint_every วินาที
+    """
+
+    def __init__(self, interval: float, thread_id=None, checkpoint=None, checkpoint_every: float = 5.0):
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.checkpoint = checkpoint
+        self.checkpoint_every = checkpoint_every
+        self.samples = 0
+        self._stacks = Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        next_checkpoint = time.time() + self.checkpoint_every
+
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+
+            stack = []
+            while frame is not None and len(stack) < MAX_DEPTH:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+
+            with self._lock:
+                self._stacks[";".join(reversed(stack))] += 1
+                self.samples += 1
+
+            if self.checkpoint is not None and time.time() >= next_checkpoint:
+                next_checkpoint = time.time() + self.checkpoint_every
+                try:
+                    self.checkpoint(self)
+                except Exception as e:
+                    print(f"⚠️ Sampler checkpoint failed: {e}")
+
+    def folded(self) -> str:
+        """
+        folded stacks: 1 บรรทัดต่อ stack เรียงตามจำนวน sample มากไปน้อย
+        """
+        with self._lock:
+            return "".join(f"{stack} {count}\n" for stack, count in self._stacks.most_common())
+
+
+def format_folded(folded: str, limit: int = 40) -> str:
+    """
+    สรุป folded stacks เป็นตาราง function ที่กินเวลามากที่สุด
+    self = เป็น leaf ของ stack (กำลังทำงานอยู่เอง), total = อยู่ที่ไหนก็ได้ใน stack
+    """
+    own, total = Counter(), Counter()
+    samples = 0
+
+    for line in folded.splitlines():
+        stack, _, count = line.rpartition(" ")
+        if not stack:
+            continue
+        count = int(count)
+        frames = stack.split(";")
+
+        samples += count
+        own[frames[-1]] += count
+        for label in set(frames):
+            total[label] += count
+
+    if not samples:
+        return ""
+
+    lines = [f"{samples} samples", f"{'self%':>7} {'total%':>7}  function"]
+    for label, count in total.most_common(limit):
+        lines.append(f"{own[label] / samples:7.1%} {count / samples:7.1%}  {label}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,53 @@
+import time
+from contextlib import contextmanager, nullcontext
+
+
+class StageTimer:
+    """
+    จับเวลาแต่ละ stage ของ pipeline (preprocess, ocr, parse, callback, ...)
+    """
+
+    def __init__(self):
+        self.stages = []
+        # stage ที่ยังไม่จบ (name, start) ไว้ดูว่า job ค้างอยู่ตรงไหน
+        self.running = []
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.time()
+        entry = (name, start)
+        self.running.append(entry)
+        try:
+            yield
+        finally:
+            end = time.time()
+            self.running.remove(entry)
+            self.stages.append({
+                "name": name,
+                "start": start,
+                "end": end,
+                "seconds": round(end - start, 4),
+            })
+
+    def breakdown(self) -> dict:
+        """
+        รวมเวลาตามชื่อ stage: {"ocr": 12.3, ...}
+        """
+        totals = {}
+        for s in self.stages:
+            totals[s["name"]] = round(totals.get(s["name"], 0) + s["seconds"], 4)
+        return totals
+
+    def running_stages(self) -> list:
+        """
+        stage ที่กำลังทำอยู่ (นอกสุดก่อน): [{"name": "ocr", "seconds": 95.2}, ...]
+        """
+        now = time.time()
+        return [{"name": name, "seconds": round(now - start, 4)} for name, start in list(self.running)]
+
+
+def stage(timer, name: str):
+    """
+    timer.stage(name) ถ้ามี timer ไม่งั้นไม่ทำอะไร
+    """
+    return timer.stage(name) if timer is not None else nullcontext()
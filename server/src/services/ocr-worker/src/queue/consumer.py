@@ -4,23 +4,66 @@ import traceback
 import time
 import cv2
 
-from config import REDIS_HOST, REDIS_PORT, REDIS_CHANNEL
+from config import (
+    REDIS_HOST,
+    REDIS_PORT,
+    REDIS_CHANNEL,
+    OCR_MIN_PROCESSES,
+)
 
-from src.preprocessing.image import preprocess_image
-from src.ocr.extractor import extract_text_with_log
-from src.parser.slip_parser import parse_bill_slip
+from src.pipeline.slip import run_slip_pipeline
+from src.ocr.extractor import download_models
 from src.callback.notify import send_ocr_result
-from src.utils.logger import log_ocr_result
+from src.queue.idempotency import begin_job, finish_job, abandon_job, get_result
+from src.queue.dead_letter import (
+    CALLBACK_ERROR,
+    classify_failure,
+    record_failure,
+    get_quarantine,
+    clear_failure,
+    start_retry_scheduler,
+)
+from src.profiling.profiler import profile_job
+from src.tracing.trace import JobTrace
+from src.tracing.exporter import export_trace
+from src.queue.pool import OcrWorkerPool
+from src.scaling.autoscaler import Autoscaler, threads_for
 
 # Reconnection config
 MAX_RECONNECT_DELAY = 30  # seconds
 INITIAL_RECONNECT_DELAY = 2  # seconds
 
 
-def _process_job(message):
-    """Process a single OCR job from Redis. Returns (job_id, success)."""
+def _notify_waiters(job_id, waiters, status, data, trace=None):
+    """
+    ส่งผลให้ job ซ้ำที่ coalesce มารอ execution นี้ (best-effort)
+    trace คือ trace ของ execution ที่ทำงานจริง
+    """
+    for url in waiters:
+        try:
+            send_ocr_result(
+                callback_url=url,
+                slip_id=job_id,
+                status=status,
+                extracted_data=data,
+                trace=trace
+            )
+        except Exception as e:
+            print(f"⚠️ Callback to coalesced waiter {url} failed: {e}")
+
+
+def _process_job(message, on_computed=None):
+    """Process a single OCR job from Redis. Returns (job_id, success).
+
+    on_computed (optional) is called once OCR work is over, before callbacks
+    are sent, so the pool's job timeout does not count callback retries.
+    """
     job_id = None
     callback_url = None
+    lease = None
+    trace = None
+    # job ซ้ำที่ coalesce มารอ: finish_job ส่งคืนแล้วลบออกจาก Redis จึงต้องแจ้งทุกทาง
+    waiters = set()
 
     try:
         job = json.loads(message["data"])
@@ -29,45 +72,124 @@ def _process_job(message):
         image_path = job["image_path"]
         callback_url = job["callback_url"]
 
-        print(f"📥 รับ job_id={job_id}")
+        # trace_id / enqueued_at จาก QueueService.publishOcrJob (ไม่มีก็สร้าง trace ใหม่)
+        trace = JobTrace.from_job(job, received_at=message.get("received_at"))
 
-        image = preprocess_image(image_path, job_id)
-        h, w = image.shape[:2]
+        queue_wait = trace.queue_wait()
+        print(
+            f"📥 รับ job_id={job_id} trace_id={trace.trace_id}"
+            + (f" queue_wait={queue_wait}s" if queue_wait is not None else "")
+        )
 
-        ocr_result = extract_text_with_log(image)
+        # poison job: fail ซ้ำจนถูก quarantine แล้ว ไม่ต้องเสีย CPU อีก
+        # ยกเว้นมีผลที่เก็บไว้แล้ว: ปล่อยให้ replay ส่งผลนั้น (ไม่ต้อง OCR ใหม่)
+        with trace.stage("quarantine_check"):
+            quarantine = get_quarantine(job_id)
+            if quarantine and get_result(job_id):
+                print(f"♻️ job_id={job_id} is quarantined but has a stored result → replay")
+                quarantine = None
 
-        parsed = parse_bill_slip(
-            words=ocr_result["words"],
-            image_width=w,
-            image_height=h
-        )
+        if quarantine:
+            if on_computed:
+                on_computed()
+            print(f"☣️ job_id={job_id} is quarantined ({quarantine['failure_class']}) → skipped")
+            error = f"quarantined ({quarantine['failure_class']}): {quarantine['error']}"
+            try:
+                with trace.stage("callback"):
+                    send_ocr_result(
+                        callback_url=callback_url,
+                        slip_id=job_id,
+                        status="failed",
+                        extracted_data={"error": error},
+                        trace=trace.to_payload()
+                    )
+            except Exception as cb_err:
+                print(f"⚠️ Callback for quarantined job failed: {cb_err}")
+            export_trace(trace, "quarantined", error)
+            return job_id, False
 
-        # Inject missing fields for Frontend compatibility
-        if isinstance(parsed, dict):
-            parsed["confidence"] = ocr_result.get("confidence_avg", 0)
-            parsed["rawText"] = ocr_result.get("raw_text", "")
-            parsed["transactionId"] = job_id  # Use job_id as transactionId
-
-        log_ocr_result(job_id, {
-            "job_id": job_id,
-            "image_path": image_path,
-            "ocr": ocr_result,
-            "parsed": parsed
-        })
-
-        send_ocr_result(
-            callback_url=callback_url,
-            slip_id=job_id,
-            status="success",
-            extracted_data=parsed
-        )
+        # job_id ซ้ำ (requeue / client retry) ไม่ต้องรัน OCR ใหม่
+        with trace.stage("dedupe"):
+            decision, state = begin_job(job_id, callback_url)
+
+        if decision != "run" and on_computed:
+            on_computed()
+
+        if decision == "coalesced":
+            # callback มาจาก execution ที่รันอยู่ (พร้อม trace ของ execution นั้น)
+            print(f"🔗 job_id={job_id} already running → coalesced")
+            export_trace(trace, "coalesced")
+            return job_id, True
+
+        if decision == "replay":
+            print(f"♻️ job_id={job_id} already done → replay stored result")
+            try:
+                with trace.stage("callback"):
+                    send_ocr_result(
+                        callback_url=callback_url,
+                        slip_id=job_id,
+                        status=state["status"],
+                        extracted_data=state["data"],
+                        trace=trace.to_payload()
+                    )
+            except Exception as cb_err:
+                print(f"⚠️ Replay callback failed: {cb_err}")
+                # retry ต่อด้วย backoff จนกว่า callback จะสำเร็จ (callback_error ไม่ถูก quarantine)
+                record_failure(message["data"], CALLBACK_ERROR, cb_err)
+                export_trace(trace, "failed", str(cb_err))
+                return job_id, False
+
+            # retry จาก dead-letter (callback_error) ที่ replay สำเร็จ → เอาออกจาก DLQ
+            clear_failure(job_id)
+            export_trace(trace, "replayed")
+            return job_id, True
+
+        lease = state
+
+        with profile_job(job_id, trace):
+            result = run_slip_pipeline(image_path, job_id, timer=trace)
+            parsed = result["parsed"]
+
+            # เก็บผลก่อน callback: job ซ้ำที่มาระหว่าง retry callback จะ replay แทน
+            waiters = finish_job(lease, job_id, callback_url, "success", parsed)
+            lease = None
+
+            if on_computed:
+                on_computed()
+
+            with trace.stage("callback"):
+                try:
+                    send_ocr_result(
+                        callback_url=callback_url,
+                        slip_id=job_id,
+                        status="success",
+                        extracted_data=parsed,
+                        trace=trace.to_payload()
+                    )
+                finally:
+                    # ผลสำเร็จแล้ว: waiters ได้ success แม้ callback หลักจะ fail
+                    notified, waiters = waiters, set()
+                    _notify_waiters(job_id, notified, "success", parsed, trace.to_payload())
+
+        clear_failure(job_id)
+        export_trace(trace, "success")
 
         print(f"✅ job_id={job_id} success")
+        return job_id, True
 
     except Exception as e:
         print(f"❌ job_id={job_id} failed: {e}")
         traceback.print_exc()
 
+        if on_computed:
+            on_computed()
+
+        if lease is not None:
+            waiters |= finish_job(lease, job_id, callback_url, "failed", {"error": str(e)})
+
+        if job_id:
+            record_failure(message["data"], classify_failure(e), e)
+
         # Try to notify server about the failure (best-effort, don't crash)
         if job_id and callback_url:
             try:
@@ -75,18 +197,74 @@ def _process_job(message):
                     callback_url=callback_url,
                     slip_id=job_id,
                     status="failed",
-                    extracted_data={"error": str(e)}
+                    extracted_data={"error": str(e)},
+                    trace=trace.to_payload() if trace else None
                 )
             except Exception as cb_err:
                 print(f"⚠️ Callback for failed job also failed: {cb_err}")
 
+        export_trace(trace, "failed", str(e))
+
+        _notify_waiters(job_id, waiters, "failed", {"error": str(e)}, trace.to_payload() if trace else None)
+
+        return job_id, False
+
+
+def _handle_lost_job(data, failure_class, error):
+    """
+    job ที่หายไปกับ OCR process (timeout / crash): dead-letter + แจ้ง failed
+    """
+    try:
+        job = json.loads(data)
+        job_id = job["job_id"]
+        callback_url = job["callback_url"]
+    except (ValueError, KeyError, TypeError):
+        record_failure(data, failure_class, error)
+        return
+
+    # process ตายหลัง OCR เสร็จ (ผลเก็บแล้ว) แต่อาจยังส่ง callback ไม่ครบ
+    # → retry แบบ callback_error: replay ผลเดิม ไม่ต้อง OCR ใหม่ ไม่แจ้ง failed
+    if get_result(job_id):
+        print(f"⚠️ job_id={job_id} process exited after OCR finished → callback retry")
+        record_failure(data, CALLBACK_ERROR, error)
+        return
+
+    record_failure(data, failure_class, error)
+
+    print(f"❌ job_id={job_id} lost: {error}")
+
+    # lease ของ process ที่ตายไปแล้วปล่อยทันที ให้ retry รันใหม่ได้
+    waiters = abandon_job(job_id)
+    _notify_waiters(job_id, waiters | {callback_url}, "failed", {"error": error})
+
+
+def _start_pool():
+    """
+    สร้าง OCR process pool + autoscaler + dead-letter retry (ครั้งเดียวต่อ worker)
+    """
+    # โมเดลต้องอยู่บนดิสก์ก่อน spawn: process ใหม่แค่โหลด ไม่ต้องดาวน์โหลดระหว่างทำ job
+    try:
+        download_models()
+    except Exception as e:
+        print(f"⚠️ EasyOCR model download failed, OCR processes will retry: {e}")
+
+    pool = OcrWorkerPool(
+        processes=OCR_MIN_PROCESSES,
+        threads=threads_for(OCR_MIN_PROCESSES),
+        on_lost=_handle_lost_job
+    )
+    Autoscaler(pool).start()
+    start_retry_scheduler()
+    return pool
+
 
 def start_consumer():
     """
-    Subscribe to Redis Pub/Sub and process OCR jobs.
+    Subscribe to Redis Pub/Sub and dispatch OCR jobs to the process pool.
     Automatically reconnects to Redis with exponential backoff.
     """
     reconnect_delay = INITIAL_RECONNECT_DELAY
+    pool = _start_pool()
 
     while True:
         try:
@@ -112,7 +290,7 @@ def start_consumer():
             for message in pubsub.listen():
                 if message["type"] != "message":
                     continue
-                _process_job(message)
+                pool.submit(message["data"])
 
         except redis.exceptions.ConnectionError as e:
             print(f"🔴 Redis connection lost: {e}")
@@ -0,0 +1,246 @@
+import json
+import threading
+import time
+
+import redis
+
+from config import (
+    REDIS_CHANNEL,
+    DLQ_MAX_ATTEMPTS,
+    DLQ_RETRY_BACKOFF,
+    DLQ_RETRY_MAX_BACKOFF,
+    DLQ_TTL,
+)
+from src.callback.notify import CallbackError
+from src.parser.slip_parser import UnknownLayoutError
+from src.preprocessing.image import ImageDecodeError
+from src.queue.redis_client import get_client
+from src.tracing.trace import restamp
+
+# --------------------
+# Failure classes
+# --------------------
+MISSING_FILE = "missing_file"
+DECODE_ERROR = "decode_error"
+UNKNOWN_LAYOUT = "unknown_layout"
+OCR_TIMEOUT = "ocr_timeout"
+CRASH = "crash"
+CALLBACK_ERROR = "callback_error"
+ERROR = "error"
+
+# รันซ้ำก็ได้ผลเดิม → quarantine ทันทีไม่ต้อง retry
+PERMANENT_FAILURES = {MISSING_FILE, DECODE_ERROR, UNKNOWN_LAYOUT}
+
+# ผล OCR เก็บไว้แล้ว มีแค่ callback ที่ส่งไม่ถึง → retry ต่อเรื่อย ๆ ไม่ quarantine
+# (quarantine จะทำให้ผลที่ถูกต้องไม่เคยถูกส่ง)
+NEVER_QUARANTINE = {CALLBACK_ERROR}
+
+# --------------------
+# Redis keys
+# --------------------
+DLQ_INDEX_KEY = "ocr:dlq"            # zset: job_id → last_failed_at
+DLQ_ENTRY_KEY = "ocr:dlq:{}"         # hash: รายละเอียดของ job ที่ fail
+DLQ_RETRY_KEY = "ocr:dlq:retry"      # zset: job_id → เวลาที่ต้อง retry
+
+RETRY_POLL_INTERVAL = 5  # seconds
+
+
+def classify_failure(exc: Exception) -> str:
+    if isinstance(exc, FileNotFoundError):
+        return MISSING_FILE
+    if isinstance(exc, ImageDecodeError):
+        return DECODE_ERROR
+    if isinstance(exc, UnknownLayoutError):
+        return UNKNOWN_LAYOUT
+    if isinstance(exc, CallbackError):
+        return CALLBACK_ERROR
+    return ERROR
+
+
+def _decode_entry(entry: dict):
+    if not entry:
+        return None
+
+    entry["attempts"] = int(entry.get("attempts", 0))
+    entry["quarantined"] = entry.get("quarantined") == "1"
+    for field in ("first_failed_at", "last_failed_at", "retry_at"):
+        if entry.get(field):
+            entry[field] = float(entry[field])
+    return entry
+
+
+def record_failure(data: str, failure_class: str, error: str):
+    """
+    บันทึก job ที่ fail ลง dead-letter store
+
+    - failure แบบ permanent หรือ fail ครบ DLQ_MAX_ATTEMPTS → quarantine
+    - callback_error ไม่ถูก quarantine: retry ไปจนกว่า callback จะสำเร็จ
+    - นอกนั้น ตั้งเวลา retry อัตโนมัติ (exponential backoff สูงสุด DLQ_RETRY_MAX_BACKOFF)
+    """
+    try:
+        job = json.loads(data)
+        job_id = job["job_id"]
+    except (ValueError, KeyError, TypeError):
+        print(f"⚠️ Cannot dead-letter malformed job: {data!r}")
+        return None
+
+    try:
+        client = get_client()
+        key = DLQ_ENTRY_KEY.format(job_id)
+        now = time.time()
+
+        already_quarantined = client.hget(key, "quarantined") == "1"
+        attempts = client.hincrby(key, "attempts", 1)
+        client.hsetnx(key, "first_failed_at", now)
+        fields = {
+            "job_id": job_id,
+            "job": data,
+            "image_path": job.get("image_path", ""),
+            "failure_class": failure_class,
+            "error": str(error)[:1000],
+            "last_failed_at": now,
+            "quarantined": "0",
+            "retry_at": "",
+        }
+
+        quarantine = (
+            already_quarantined
+            or failure_class in PERMANENT_FAILURES
+            or attempts >= DLQ_MAX_ATTEMPTS
+        )
+
+        if quarantine and failure_class not in NEVER_QUARANTINE:
+            fields["quarantined"] = "1"
+            client.zrem(DLQ_RETRY_KEY, job_id)
+            print(f"☣️ job_id={job_id} quarantined ({failure_class}, attempts={attempts})")
+        else:
+            backoff = DLQ_RETRY_BACKOFF * (2 ** min(attempts - 1, 16))
+            retry_at = now + min(backoff, DLQ_RETRY_MAX_BACKOFF)
+            fields["retry_at"] = retry_at
+            client.zadd(DLQ_RETRY_KEY, {job_id: retry_at})
+            print(f"🔁 job_id={job_id} dead-lettered ({failure_class}), retry in {retry_at - now:.0f}s")
+
+        client.hset(key, mapping=fields)
+        client.expire(key, DLQ_TTL)
+        client.zadd(DLQ_INDEX_KEY, {job_id: now})
+
+        return _decode_entry(client.hgetall(key))
+
+    except redis.exceptions.RedisError as e:
+        print(f"⚠️ Cannot record failure for job_id={job_id}: {e}")
+        return None
+
+
+def get_quarantine(job_id: str):
+    """
+    คืน entry ถ้า job นี้ถูก quarantine (ไม่งั้น None)
+    """
+    try:
+        client = get_client()
+        key = DLQ_ENTRY_KEY.format(job_id)
+
+        if client.hget(key, "quarantined") != "1":
+            return None
+        return _decode_entry(client.hgetall(key))
+
+    except redis.exceptions.RedisError as e:
+        print(f"⚠️ Quarantine check skipped for job_id={job_id}: {e}")
+        return None
+
+
+def clear_failure(job_id: str):
+    """
+    ลบ job ออกจาก dead-letter store (เรียกเมื่อ job สำเร็จ)
+    """
+    try:
+        client = get_client()
+        client.delete(DLQ_ENTRY_KEY.format(job_id))
+        client.zrem(DLQ_INDEX_KEY, job_id)
+        client.zrem(DLQ_RETRY_KEY, job_id)
+    except redis.exceptions.RedisError as e:
+        print(f"⚠️ Cannot clear dead-letter entry for job_id={job_id}: {e}")
+
+
+# --------------------
+# Inspection / replay
+# --------------------
+def list_entries(quarantined_only: bool = False, limit: int = 100) -> list:
+    client = get_client()
+    entries = []
+
+    for job_id in client.zrevrange(DLQ_INDEX_KEY, 0, -1):
+        entry = _decode_entry(client.hgetall(DLQ_ENTRY_KEY.format(job_id)))
+
+        if entry is None:
+            # hash หมดอายุไปแล้ว
+            client.zrem(DLQ_INDEX_KEY, job_id)
+            continue
+        if quarantined_only and not entry["quarantined"]:
+            continue
+
+        entry.pop("job", None)
+        entries.append(entry)
+        if len(entries) >= limit:
+            break
+
+    return entries
+
+
+def get_entry(job_id: str):
+    return _decode_entry(get_client().hgetall(DLQ_ENTRY_KEY.format(job_id)))
+
+
+def replay(job_id: str):
+    """
+    ปลด quarantine / รีเซ็ต attempts แล้ว publish job เดิมกลับเข้า queue
+    """
+    entry = get_entry(job_id)
+    if entry is None:
+        return None
+
+    client = get_client()
+    clear_failure(job_id)
+    client.publish(REDIS_CHANNEL, restamp(entry["job"]))
+
+    print(f"▶️ job_id={job_id} replayed from dead-letter store")
+    return entry
+
+
+def discard(job_id: str) -> bool:
+    if get_entry(job_id) is None:
+        return False
+    clear_failure(job_id)
+    return True
+
+
+# --------------------
+# Automatic retry
+# --------------------
+def _retry_due():
+    client = get_client()
+    now = time.time()
+
+    for job_id in client.zrangebyscore(DLQ_RETRY_KEY, 0, now):
+        # zrem สำเร็จ = replica นี้ได้สิทธิ์ retry (กัน publish ซ้ำหลาย replica)
+        if not client.zrem(DLQ_RETRY_KEY, job_id):
+            continue
+
+        data = client.hget(DLQ_ENTRY_KEY.format(job_id), "job")
+        if data:
+            client.publish(REDIS_CHANNEL, restamp(data))
+            print(f"🔁 job_id={job_id} retried from dead-letter store")
+
+
+def _retry_loop():
+    while True:
+        try:
+            _retry_due()
+        except redis.exceptions.RedisError as e:
+            print(f"⚠️ Dead-letter retry failed: {e}")
+        time.sleep(RETRY_POLL_INTERVAL)
+
+
+def start_retry_scheduler():
+    thread = threading.Thread(target=_retry_loop, daemon=True)
+    thread.start()
+    return thread
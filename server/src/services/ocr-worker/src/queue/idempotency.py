@@ -0,0 +1,212 @@
+import json
+import threading
+import uuid
+
+import redis
+
+from config import JOB_LEASE_TTL, JOB_RESULT_TTL
+from src.queue.redis_client import get_client
+from src.utils.logger import to_json_safe
+
+# --------------------
+# Redis keys
+# --------------------
+LEASE_KEY = "ocr:job:{}:lease"        # owner token ของ execution ที่กำลังรัน
+RESULT_KEY = "ocr:job:{}:result"      # ผลล่าสุด (replay ให้ job ซ้ำ)
+WAITERS_KEY = "ocr:job:{}:waiters"    # callback_url ของ job ซ้ำที่มารอ execution เดิม
+
+# ต่ออายุ / ปล่อย lease เฉพาะเมื่อยังเป็นเจ้าของอยู่
+_RENEW_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+# ลงชื่อรอเฉพาะเมื่อ lease ยังอยู่ (atomic กับ _FINISH_SCRIPT: ไม่มี waiter ตกหล่น)
+_JOIN_SCRIPT = """
+if redis.call('exists', KEYS[1]) == 0 then
+    return 0
+end
+redis.call('sadd', KEYS[2], ARGV[1])
+redis.call('expire', KEYS[2], ARGV[2])
+return 1
+"""
+
+# เก็บผล (ถ้ามี) + เอา waiters ออก + ปล่อย lease ในขั้นเดียว
+_FINISH_SCRIPT = """
+if ARGV[2] ~= '' then
+    redis.call('set', KEYS[3], ARGV[2], 'EX', ARGV[3])
+end
+local waiters = redis.call('smembers', KEYS[2])
+redis.call('del', KEYS[2])
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    redis.call('del', KEYS[1])
+end
+return waiters
+"""
+
+_ABANDON_SCRIPT = """
+local waiters = redis.call('smembers', KEYS[2])
+redis.call('del', KEYS[1], KEYS[2])
+return waiters
+"""
+
+# จำนวนรอบสูงสุดของ acquire → join (lease หายไประหว่างสองขั้นนี้)
+_BEGIN_ATTEMPTS = 3
+
+
+class JobLease:
+    """
+    Lease ของ job_id ใน Redis (SET NX + TTL)
+
+    ระหว่างรันจะต่ออายุทุก ttl/3 วินาที ถ้า worker crash
+    lease จะหมดอายุเองและ job ซ้ำครั้งถัดไปรันใหม่ได้
+    """
+
+    def __init__(self, client, job_id: str, ttl: int = JOB_LEASE_TTL):
+        self.client = client
+        self.job_id = job_id
+        self.ttl = ttl
+        self.key = LEASE_KEY.format(job_id)
+        self.token = uuid.uuid4().hex
+        self._stop = threading.Event()
+        self._heartbeat = None
+
+    def acquire(self) -> bool:
+        if not self.client.set(self.key, self.token, nx=True, ex=self.ttl):
+            return False
+
+        self._heartbeat = threading.Thread(target=self._renew_loop, daemon=True)
+        self._heartbeat.start()
+        return True
+
+    def _renew_loop(self):
+        while not self._stop.wait(self.ttl / 3):
+            try:
+                if not self.client.eval(_RENEW_SCRIPT, 1, self.key, self.token, self.ttl * 1000):
+                    print(f"⚠️ Lease for job_id={self.job_id} lost")
+                    return
+            except redis.exceptions.RedisError as e:
+                print(f"⚠️ Lease renew failed for job_id={self.job_id}: {e}")
+
+    def stop_renewing(self):
+        self._stop.set()
+
+    def release(self):
+        self.stop_renewing()
+        try:
+            self.client.eval(_RELEASE_SCRIPT, 1, self.key, self.token)
+        except redis.exceptions.RedisError as e:
+            print(f"⚠️ Lease release failed for job_id={self.job_id}: {e}")
+
+
+def _load_result(client, job_id: str):
+    stored = client.get(RESULT_KEY.format(job_id))
+    return json.loads(stored) if stored else None
+
+
+def get_result(job_id: str):
+    """
+    ผลที่เก็บไว้ของ job_id ({"status", "data"}) หรือ None (รวมกรณี Redis ใช้ไม่ได้)
+    """
+    try:
+        return _load_result(get_client(), job_id)
+    except redis.exceptions.RedisError as e:
+        print(f"⚠️ Cannot read stored result for job_id={job_id}: {e}")
+        return None
+
+
+def begin_job(job_id: str, callback_url: str):
+    """
+    ตัดสินใจว่าจะรัน job นี้หรือไม่
+
+    Returns (decision, value):
+    - ("run", JobLease | None): เป็นเจ้าของ execution (None = Redis ใช้ไม่ได้ รันแบบเดิม)
+    - ("replay", {"status", "data"}): เคยทำเสร็จแล้ว ส่งผลเดิมกลับไป
+    - ("coalesced", None): มี execution อื่นกำลังรันอยู่ จะได้ผลจาก execution นั้น
+    """
+    try:
+        client = get_client()
+
+        for _ in range(_BEGIN_ATTEMPTS):
+            stored = _load_result(client, job_id)
+            if stored:
+                return "replay", stored
+
+            lease = JobLease(client, job_id)
+            if lease.acquire():
+                # อาจเพิ่งเสร็จระหว่าง get กับ acquire
+                stored = _load_result(client, job_id)
+                if stored:
+                    lease.release()
+                    return "replay", stored
+                return "run", lease
+
+            joined = client.eval(
+                _JOIN_SCRIPT, 2,
+                LEASE_KEY.format(job_id), WAITERS_KEY.format(job_id),
+                callback_url, JOB_LEASE_TTL + JOB_RESULT_TTL
+            )
+            if joined:
+                return "coalesced", None
+
+            # เจ้าของเสร็จ (หรือ lease หมดอายุ) ระหว่าง acquire กับ join → ลองใหม่
+
+        print(f"⚠️ job_id={job_id} lease kept changing hands → running without lease")
+        return "run", None
+
+    except redis.exceptions.RedisError as e:
+        print(f"⚠️ Idempotency check skipped for job_id={job_id}: {e}")
+        return "run", None
+
+
+def finish_job(lease, job_id: str, callback_url: str, status: str, data) -> set:
+    """
+    บันทึกผล (เฉพาะ success) ปล่อย lease และคืน callback_url ของ job ซ้ำที่รออยู่
+    job ที่ failed ไม่ถูกเก็บ เพื่อให้ retry ครั้งถัดไปรันใหม่ได้
+    """
+    if lease is None:
+        return set()
+
+    lease.stop_renewing()
+
+    try:
+        result = ""
+        if status == "success":
+            result = json.dumps(to_json_safe({"status": status, "data": data}), ensure_ascii=False)
+
+        waiters = lease.client.eval(
+            _FINISH_SCRIPT, 3,
+            lease.key, WAITERS_KEY.format(job_id), RESULT_KEY.format(job_id),
+            lease.token, result, JOB_RESULT_TTL
+        )
+
+        return set(waiters) - {callback_url}
+
+    except redis.exceptions.RedisError as e:
+        print(f"⚠️ Cannot store result for job_id={job_id}: {e}")
+        lease.release()
+        return set()
+
+
+def abandon_job(job_id: str) -> set:
+    """
+    ปล่อย lease ของ execution ที่ตายไปแล้ว (timeout / crash) ทันที
+    ไม่ต้องรอ TTL และคืน callback_url ของ job ซ้ำที่รออยู่
+    """
+    try:
+        client = get_client()
+        waiters = client.eval(_ABANDON_SCRIPT, 2, LEASE_KEY.format(job_id), WAITERS_KEY.format(job_id))
+        return set(waiters)
+
+    except redis.exceptions.RedisError as e:
+        print(f"⚠️ Cannot abandon lease for job_id={job_id}: {e}")
+        return set()
@@ -0,0 +1,421 @@
+import json
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+import traceback
+from collections import deque
+
+from config import AUTOSCALE_WINDOW, OCR_JOB_TIMEOUT
+from src.queue.dead_letter import OCR_TIMEOUT, CRASH
+from src.profiling.profiler import save_killed_job
+
+# sentinel: บอกให้ worker process ออกจาก loop
+_STOP = None
+
+
+def _apply_torch_threads(threads: int):
+    """
+    ตั้งจำนวน intra-op threads ของ torch ใน process นี้
+    """
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except Exception as e:
+        print(f"⚠️ Cannot set torch threads={threads}: {e}")
+
+
+def _worker_main(task_queue, event_queue, threads_value, current_token):
+    """
+    Entry point ของ OCR worker process
+
+    - ดึง job จาก task_queue ทีละงาน แล้วเขียน token ลง current_token ทันที
+      (shared memory: process หลักรู้ว่างานไหนหายไปถ้า process ตายก่อน event ถึง)
+    - โหลดโมเดล EasyOCR ก่อนรับงานแรก (ไม่นับเข้า latency / job timeout)
+    - ปรับ torch threads ตามค่าที่ autoscaler ตั้งไว้ก่อนเริ่มงานถัดไป
+    - ส่ง event start / computed / done กลับไปให้ process หลัก
+    """
+    # import ที่นี่ เพื่อให้ EasyOCR โหลดใน worker process เท่านั้น
+    from src.queue.consumer import _process_job
+    from src.ocr.extractor import get_reader, recognition_cache
+
+    pid = os.getpid()
+    current_threads = threads_value.value
+    _apply_torch_threads(current_threads)
+
+    warm_started = time.time()
+    try:
+        get_reader()
+        print(f"🔥 OCR process pid={pid} ready in {time.time() - warm_started:.1f}s")
+    except Exception:
+        # โหลดไม่สำเร็จ: ลองใหม่ตอนได้ job แรก (job นั้นจะ fail ตามปกติถ้ายังพัง)
+        traceback.print_exc()
+
+    while True:
+        task = task_queue.get()
+        if task is _STOP:
+            break
+
+        current_token.value = task["token"]
+
+        if threads_value.value != current_threads:
+            current_threads = threads_value.value
+            _apply_torch_threads(current_threads)
+
+        started_at = time.time()
+        event_queue.put({
+            "event": "start",
+            "token": task["token"],
+            "pid": pid,
+        })
+
+        def on_computed(token=task["token"]):
+            event_queue.put({
+                "event": "computed",
+                "token": token,
+                "pid": pid,
+            })
+
+        job_id, success = None, False
+        try:
+            job_id, success = _process_job(
+                {"data": task["data"], "received_at": task["received_at"]},
+                on_computed
+            )
+        except Exception:
+            traceback.print_exc()
+
+        event_queue.put({
+            "event": "done",
+            "token": task["token"],
+            "pid": pid,
+            "job_id": job_id,
+            "success": success,
+            "received_at": task["received_at"],
+            "started_at": started_at,
+            "finished_at": time.time(),
+            "recognition_cache": recognition_cache.stats(),
+        })
+
+
+class OcrWorkerPool:
+    """
+    Pool ของ OCR processes ที่ปรับขนาดได้ระหว่างทำงาน
+
+    ProcessPoolExecutor ปรับขนาดไม่ได้ จึงจัดการ process เอง:
+    - ขยาย = spawn process ใหม่
+    - ลด = ส่ง _STOP ให้ process ที่ว่างออกไปเอง
+    - job ที่รันเกิน job_timeout จะถูก kill ทั้ง process แล้ว spawn ใหม่แทน
+
+    job ที่หายไปกับ process (timeout / crash) ถูกส่งให้ on_lost(data, failure_class, error)
+    """
+
+    def __init__(
+        self,
+        processes: int,
+        threads: int,
+        window: int = AUTOSCALE_WINDOW,
+        job_timeout: float = OCR_JOB_TIMEOUT,
+        on_lost=None
+    ):
+        # spawn แทน fork: torch / OpenMP ไม่ปลอดภัยเมื่อ fork หลังมี threads
+        self._ctx = mp.get_context("spawn")
+        self._task_queue = self._ctx.Queue()
+        self._event_queue = self._ctx.Queue()
+        self._threads = self._ctx.Value("i", threads)
+        # pid -> token ล่าสุดที่ process นั้นหยิบไป (0 = ยังไม่เคยหยิบ)
+        self._current = {}
+
+        self._lock = threading.Lock()
+        self._processes = []
+        self._size = 0
+        self._pending_stops = 0
+        self._next_token = 0
+
+        # token -> received_at (ทั้งที่รอคิวและกำลังทำ)
+        self._inflight = {}
+        # token -> raw job message
+        self._tasks = {}
+        # token -> (pid, started_at) (กำลังทำอยู่, started_at=None เมื่อ OCR เสร็จแล้ว)
+        self._running = {}
+        # pid -> token ของ process ที่ถูก kill เพราะ timeout
+        self._timed_out = {}
+        # (data, failure_class, error) ที่รอส่งให้ on_lost
+        self._lost = []
+        # (pid, data, elapsed) ของ job ที่ถูก kill รอเก็บเป็น slow job
+        self._killed = []
+
+        self.job_timeout = job_timeout
+        self.on_lost = on_lost
+
+        # latency ของงานล่าสุด (seconds)
+        self._e2e_latencies = deque(maxlen=window)
+        self._service_latencies = deque(maxlen=window)
+        self._completed = 0
+        self._failed = 0
+        # pid -> recognition cache stats ล่าสุดของ process นั้น (สะสมตั้งแต่ process เริ่ม)
+        self._recognition_cache = {}
+
+        self.resize(processes)
+
+        self._collector = threading.Thread(
+            target=self._collect_events,
+            daemon=True
+        )
+        self._collector.start()
+
+    # --------------------
+    # Sizing
+    # --------------------
+    def _spawn(self):
+        current_token = self._ctx.Value("q", 0, lock=False)
+        proc = self._ctx.Process(
+            target=_worker_main,
+            args=(self._task_queue, self._event_queue, self._threads, current_token),
+            daemon=True
+        )
+        proc.start()
+        self._processes.append(proc)
+        self._current[proc.pid] = current_token
+
+    def resize(self, processes: int):
+        """
+        ปรับจำนวน OCR processes ให้เท่ากับ processes
+        """
+        with self._lock:
+            while self._size < processes:
+                self._spawn()
+                self._size += 1
+
+            while self._size > processes:
+                self._task_queue.put(_STOP)
+                self._pending_stops += 1
+                self._size -= 1
+
+    def set_threads(self, threads: int):
+        """
+        ตั้ง torch intra-op threads ต่อ process (มีผลตั้งแต่งานถัดไป)
+        """
+        self._threads.value = threads
+
+    def _dead_pids_locked(self) -> set:
+        return {proc.pid for proc in self._processes if not proc.is_alive()}
+
+    def _reap_locked(self, dead_pids: set):
+        """
+        เก็บ process ใน dead_pids (ตายก่อน drain event รอบนี้) ถ้าตายเองโดยไม่ได้สั่งให้ spawn ใหม่แทน
+
+        event ที่ process ส่งก่อนตายถูก drain ไปแล้ว token ที่ยังค้างอยู่ = งานที่หายไปกับ process
+        """
+        alive = []
+        crashed = 0
+
+        for proc in self._processes:
+            if proc.pid not in dead_pids:
+                alive.append(proc)
+                continue
+
+            current_token = self._current.pop(proc.pid, None)
+
+            if self._pending_stops > 0 and proc.exitcode == 0:
+                self._pending_stops -= 1
+                continue
+
+            crashed += 1
+            timed_out = self._timed_out.pop(proc.pid, None) is not None
+            if not timed_out:
+                print(f"🔴 OCR process pid={proc.pid} exited (code={proc.exitcode})")
+
+            token = current_token.value if current_token is not None else 0
+            if token not in self._inflight:
+                continue
+
+            # งานที่ process นี้ถือไว้หายไปแล้ว (รวมกรณีที่ event start ยังไม่ทันถึง)
+            self._running.pop(token, None)
+            self._inflight.pop(token, None)
+            self._failed += 1
+
+            data = self._tasks.pop(token, None)
+            if timed_out:
+                self._lost.append((data, OCR_TIMEOUT, f"OCR job exceeded {self.job_timeout:.0f}s"))
+            else:
+                self._lost.append((data, CRASH, f"OCR process exited with code {proc.exitcode}"))
+
+        self._processes = alive
+
+        for _ in range(crashed):
+            self._spawn()
+
+    # --------------------
+    # Jobs
+    # --------------------
+    def submit(self, data: str):
+        """
+        ส่ง raw job message (JSON string จาก Redis) เข้า pool
+        """
+        with self._lock:
+            self._next_token += 1
+            token = self._next_token
+            received_at = time.time()
+            self._inflight[token] = received_at
+            self._tasks[token] = data
+
+        self._task_queue.put({
+            "token": token,
+            "data": data,
+            "received_at": received_at,
+        })
+
+    def _kill_timed_out_locked(self):
+        """
+        kill process ที่รัน job เดียวนานเกิน job_timeout (reap จะ spawn ใหม่แทน)
+        """
+        if not self.job_timeout:
+            return
+
+        now = time.time()
+        for token, (pid, started_at) in self._running.items():
+            if started_at is None or now - started_at <= self.job_timeout or pid in self._timed_out:
+                continue
+
+            for proc in self._processes:
+                if proc.pid == pid:
+                    print(f"⏱️ OCR process pid={pid} exceeded {self.job_timeout:.0f}s → killing")
+                    self._timed_out[pid] = token
+                    self._killed.append((pid, self._tasks.get(token), now - started_at))
+                    proc.kill()
+
+    def _save_killed(self):
+        """
+        เก็บ stage breakdown / samples ของ job ที่ถูก kill (process ตายก่อน profile_job จะได้เขียนเอง)
+        """
+        with self._lock:
+            killed, self._killed = self._killed, []
+
+        for pid, data, elapsed in killed:
+            try:
+                job_id = json.loads(data)["job_id"]
+            except (ValueError, KeyError, TypeError):
+                job_id = f"pid{pid}"
+
+            try:
+                save_killed_job(pid, job_id, elapsed)
+            except Exception as e:
+                print(f"⚠️ Profile save failed for killed job_id={job_id}: {e}")
+
+    def _dispatch_lost(self):
+        with self._lock:
+            lost, self._lost = self._lost, []
+
+        for data, failure_class, error in lost:
+            if data is None or self.on_lost is None:
+                continue
+            # on_lost อาจช้า (Redis + callback retry) จึงแยก thread
+            threading.Thread(
+                target=self.on_lost,
+                args=(data, failure_class, error),
+                daemon=True
+            ).start()
+
+    def _collect_events(self):
+        while True:
+            events = []
+            try:
+                events.append(self._event_queue.get(timeout=1))
+            except queue.Empty:
+                pass
+            except Exception as e:
+                print(f"⚠️ Pool event collector error: {e}")
+                time.sleep(1)
+
+            # process ที่ตายก่อน drain: event ที่มันส่งไว้อยู่ใน queue แล้วทั้งหมด
+            with self._lock:
+                dead_pids = self._dead_pids_locked()
+
+            while True:
+                try:
+                    events.append(self._event_queue.get_nowait())
+                except queue.Empty:
+                    break
+                except Exception as e:
+                    print(f"⚠️ Pool event collector error: {e}")
+                    break
+
+            with self._lock:
+                for event in events:
+                    self._handle_event_locked(event)
+                self._kill_timed_out_locked()
+                self._reap_locked(dead_pids)
+
+            self._dispatch_lost()
+            self._save_killed()
+
+    def _handle_event_locked(self, event: dict):
+        if event["event"] == "start":
+            self._running[event["token"]] = (event["pid"], time.time())
+            return
+
+        if event["event"] == "computed":
+            # เหลือแค่ส่ง callback ไม่นับ timeout แล้ว
+            if event["token"] in self._running:
+                self._running[event["token"]] = (event["pid"], None)
+            return
+
+        self._running.pop(event["token"], None)
+        self._inflight.pop(event["token"], None)
+        self._tasks.pop(event["token"], None)
+
+        self._e2e_latencies.append(event["finished_at"] - event["received_at"])
+        self._service_latencies.append(event["finished_at"] - event["started_at"])
+
+        if event["success"]:
+            self._completed += 1
+        else:
+            self._failed += 1
+
+        if event.get("recognition_cache"):
+            self._recognition_cache[event["pid"]] = event["recognition_cache"]
+
+    # --------------------
+    # Stats
+    # --------------------
+    def stats(self) -> dict:
+        """
+        สถานะของ pool สำหรับ autoscaler / metrics
+        """
+        now = time.time()
+
+        with self._lock:
+            inflight = len(self._inflight)
+            running = len(self._running)
+            oldest = min(self._inflight.values()) if self._inflight else None
+
+            return {
+                "processes": self._size,
+                "threads": self._threads.value,
+                "inflight": inflight,
+                "running": running,
+                "backlog": max(inflight - running, 0),
+                "oldest_age": (now - oldest) if oldest is not None else 0.0,
+                "e2e_latencies": list(self._e2e_latencies),
+                "service_latencies": list(self._service_latencies),
+                "completed": self._completed,
+                "failed": self._failed,
+                "recognition_cache": self._recognition_cache_totals_locked(),
+            }
+
+    def _recognition_cache_totals_locked(self) -> dict:
+        hits = sum(s["hits"] for s in self._recognition_cache.values())
+        misses = sum(s["misses"] for s in self._recognition_cache.values())
+        uncacheable = sum(s.get("uncacheable", 0) for s in self._recognition_cache.values())
+        alive = {proc.pid for proc in self._processes}
+        entries = sum(s["entries"] for pid, s in self._recognition_cache.items() if pid in alive)
+
+        return {
+            "hits": hits,
+            "misses": misses,
+            "uncacheable": uncacheable,
+            "entries": entries,
+            "hit_ratio": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+        }
@@ -0,0 +1,22 @@
+import redis
+
+from config import REDIS_HOST, REDIS_PORT
+
+# client ต่อ process (OCR pool เป็น spawn process แยกกัน)
+_client = None
+
+
+def get_client():
+    """
+    Redis client ของ process นี้ (สร้างครั้งแรกที่ถูกเรียก)
+    """
+    global _client
+
+    if _client is None:
+        _client = redis.Redis(
+            host=REDIS_HOST,
+            port=REDIS_PORT,
+            decode_responses=True,
+            socket_connect_timeout=5,
+        )
+    return _client
@@ -0,0 +1 @@
+# scaling package
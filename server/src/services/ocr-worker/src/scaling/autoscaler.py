@@ -0,0 +1,246 @@
+import json
+import math
+import threading
+import time
+import traceback
+
+import redis
+
+from config import (
+    REDIS_HOST,
+    REDIS_PORT,
+    OCR_MIN_PROCESSES,
+    OCR_MAX_PROCESSES,
+    OCR_MIN_THREADS,
+    OCR_MAX_THREADS,
+    AUTOSCALE_TARGET_P95,
+    AUTOSCALE_INTERVAL,
+    AUTOSCALE_COOLDOWN,
+    AUTOSCALE_CHANNEL,
+    cpu_limit,
+)
+from src.metrics.registry import set_gauge, inc_counter
+
+# p95 ต่ำกว่า target * ค่านี้ ถือว่ามี capacity เหลือ
+SCALE_DOWN_RATIO = 0.5
+
+
+def percentile(values, pct):
+    """
+    nearest-rank percentile (values ว่าง → None)
+    """
+    if not values:
+        return None
+
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def threads_for(processes: int) -> int:
+    """
+    แบ่ง CPU cores ให้แต่ละ process เท่า ๆ กัน ภายในขอบเขตที่ตั้งไว้
+    """
+    cores = cpu_limit()
+    threads = max(cores // max(processes, 1), 1)
+    return min(max(threads, OCR_MIN_THREADS), OCR_MAX_THREADS)
+
+
+class Autoscaler:
+    """
+    SLO-driven controller สำหรับขนาดของ OCR pool
+
+    ทุก ๆ AUTOSCALE_INTERVAL วินาที ดู backlog, อายุ job ที่เก่าที่สุด
+    และ p95 end-to-end latency แล้วเพิ่ม / ลดจำนวน process ทีละ 1
+    เพื่อให้ p95 อยู่ใต้ AUTOSCALE_TARGET_P95
+
+    ทุก decision ถูก export เป็น metrics และ publish ไปที่ Redis
+    (AUTOSCALE_CHANNEL) ให้ orchestrator ภายนอกใช้ scale replicas ได้
+    """
+
+    def __init__(
+        self,
+        pool,
+        min_processes: int = OCR_MIN_PROCESSES,
+        max_processes: int = OCR_MAX_PROCESSES,
+        target_p95: float = AUTOSCALE_TARGET_P95,
+        interval: float = AUTOSCALE_INTERVAL,
+        cooldown: float = AUTOSCALE_COOLDOWN,
+    ):
+        self.pool = pool
+        self.min_processes = max(min_processes, 1)
+        self.max_processes = max(max_processes, self.min_processes)
+        self.target_p95 = target_p95
+        self.interval = interval
+        self.cooldown = cooldown
+
+        self._last_change = 0.0
+        self._last_finished = 0
+        self._last_recognition = {}
+        self._redis = None
+        self.last_decision = None
+
+    # --------------------
+    # Decision
+    # --------------------
+    def decide(self, stats: dict, now: float) -> dict:
+        """
+        คำนวณ decision จาก stats ของ pool (ไม่มี side effect)
+        """
+        processes = stats["processes"]
+        p95 = percentile(stats["e2e_latencies"], 95)
+        backlog = stats["backlog"]
+        oldest_age = stats["oldest_age"]
+
+        finished = stats["completed"] + stats["failed"]
+        idle = stats["inflight"] == 0 and finished == self._last_finished
+
+        action = "hold"
+        reason = "within target"
+        target = processes
+
+        if processes < self.min_processes:
+            action, reason, target = "scale_up", "below min processes", self.min_processes
+
+        elif processes > self.max_processes:
+            action, reason, target = "scale_down", "above max processes", self.max_processes
+
+        elif now - self._last_change < self.cooldown:
+            reason = "cooldown"
+
+        elif oldest_age > self.target_p95 or backlog > processes or (
+            p95 is not None and p95 > self.target_p95 and backlog > 0
+        ):
+            if processes < self.max_processes:
+                action, target = "scale_up", processes + 1
+                p95_txt = f"{p95:.2f}s" if p95 is not None else "n/a"
+                reason = f"p95={p95_txt} backlog={backlog} oldest={oldest_age:.2f}s"
+            else:
+                reason = "at max processes"
+
+        elif idle or (backlog == 0 and p95 is not None and p95 < self.target_p95 * SCALE_DOWN_RATIO):
+            if processes > self.min_processes:
+                action, target = "scale_down", processes - 1
+                reason = "idle" if idle else f"p95={p95:.2f}s below target"
+
+        return {
+            "timestamp": now,
+            "action": action,
+            "reason": reason,
+            "processes_from": processes,
+            "processes": target,
+            "threads": threads_for(target),
+            "p95": p95,
+            "service_p95": percentile(stats["service_latencies"], 95),
+            "backlog": backlog,
+            "inflight": stats["inflight"],
+            "oldest_age": oldest_age,
+            "target_p95": self.target_p95,
+            "recognition_cache": stats["recognition_cache"],
+        }
+
+    # --------------------
+    # Apply / export
+    # --------------------
+    def step(self):
+        """
+        ทำ 1 รอบ: อ่าน stats → decide → apply → export
+        """
+        now = time.time()
+        stats = self.pool.stats()
+        decision = self.decide(stats, now)
+        self._last_finished = stats["completed"] + stats["failed"]
+
+        if decision["action"] != "hold":
+            self.pool.resize(decision["processes"])
+            self._last_change = now
+            print(
+                f"📈 Autoscale {decision['action']} "
+                f"{decision['processes_from']} → {decision['processes']} "
+                f"(threads={decision['threads']}, {decision['reason']})"
+            )
+
+        if decision["threads"] != stats["threads"]:
+            self.pool.set_threads(decision["threads"])
+
+        self.last_decision = decision
+        self._export_metrics(decision)
+        self._publish(decision)
+        return decision
+
+    def _export_metrics(self, decision: dict):
+        set_gauge("ocr_pool_processes", decision["processes"], help_text="OCR worker processes")
+        set_gauge("ocr_pool_threads", decision["threads"], help_text="torch intra-op threads per process")
+        set_gauge("ocr_queue_backlog", decision["backlog"], help_text="Jobs waiting for a free process")
+        set_gauge("ocr_job_oldest_age_seconds", decision["oldest_age"], help_text="Age of oldest in-flight job")
+        set_gauge("ocr_autoscale_target_p95_seconds", decision["target_p95"], help_text="Target p95 latency")
+
+        if decision["p95"] is not None:
+            set_gauge("ocr_job_latency_p95_seconds", decision["p95"], help_text="p95 end-to-end job latency")
+        if decision["service_p95"] is not None:
+            set_gauge("ocr_job_service_p95_seconds", decision["service_p95"], help_text="p95 job service time")
+
+        cache = decision["recognition_cache"]
+        for field, help_text in (
+            ("hits", "Cacheable text-line crops served from cache"),
+            ("misses", "Cacheable text-line crops sent to recognizer"),
+            ("uncacheable", "Text-line crops with digits (never cached)"),
+        ):
+            # pool รายงานยอดสะสม → export เป็น counter ด้วยส่วนต่างจากรอบก่อน
+            delta = cache[field] - self._last_recognition.get(field, 0)
+            if delta > 0:
+                inc_counter(f"ocr_recognition_cache_{field}_total", delta, help_text=help_text)
+        self._last_recognition = cache
+
+        set_gauge("ocr_recognition_cache_hit_ratio", cache["hit_ratio"], help_text="Recognition cache hit ratio")
+        set_gauge("ocr_recognition_cache_entries", cache["entries"], help_text="Cached text-line crops")
+
+        inc_counter(
+            "ocr_autoscale_decisions_total",
+            labels={"action": decision["action"]},
+            help_text="Autoscaler decisions"
+        )
+
+    def _publish(self, decision: dict):
+        """
+        publish decision ไปที่ Redis (best-effort)
+        """
+        try:
+            if self._redis is None:
+                self._redis = redis.Redis(
+                    host=REDIS_HOST,
+                    port=REDIS_PORT,
+                    decode_responses=True,
+                    socket_connect_timeout=2,
+                )
+
+            payload = json.dumps(decision)
+            self._redis.set(f"{AUTOSCALE_CHANNEL}:latest", payload)
+            self._redis.publish(AUTOSCALE_CHANNEL, payload)
+
+        except Exception as e:
+            print(f"⚠️ Autoscale publish failed: {e}")
+            self._redis = None
+
+    # --------------------
+    # Runner
+    # --------------------
+    def run(self):
+        print(
+            f"🟢 Autoscaler started | processes={self.min_processes}-{self.max_processes} "
+            f"target_p95={self.target_p95}s"
+        )
+
+        while True:
+            try:
+                self.step()
+            except Exception as e:
+                print(f"⚠️ Autoscaler error: {e}")
+                traceback.print_exc()
+
+            time.sleep(self.interval)
+
+    def start(self):
+        thread = threading.Thread(target=self.run, daemon=True)
+        thread.start()
+        return thread
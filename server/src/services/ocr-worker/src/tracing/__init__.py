@@ -0,0 +1 @@
+# tracing package
@@ -0,0 +1,101 @@
+import json
+import os
+
+from config import TRACE_EXPORT_FILE, TRACE_SERVICE_NAME
+
+# OTLP enums
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_CONSUMER = 5
+STATUS_CODE_OK = 1
+STATUS_CODE_ERROR = 2
+
+# ผลของ job ที่นับเป็น error (นอกนั้น: success / replayed / coalesced)
+ERROR_STATUSES = ("failed", "quarantined")
+
+
+def _attr(key: str, value) -> dict:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+def _nanos(ts: float) -> str:
+    return str(int(ts * 1e9))
+
+
+def to_otlp(trace, status: str, error: str = None) -> dict:
+    """
+    แปลง JobTrace เป็น OTLP/JSON ExportTraceServiceRequest
+    """
+    spans = []
+
+    for span in trace.spans():
+        root = span["parentSpanId"] is None
+        otlp = {
+            "traceId": trace.trace_id,
+            "spanId": span["spanId"],
+            "name": span["name"],
+            "kind": SPAN_KIND_CONSUMER if root else SPAN_KIND_INTERNAL,
+            "startTimeUnixNano": _nanos(span["start"]),
+            "endTimeUnixNano": _nanos(span["end"]),
+        }
+
+        if root:
+            otlp["attributes"] = [_attr("ocr.job_id", trace.job_id), _attr("ocr.status", status)]
+            if trace.queue_wait() is not None:
+                otlp["attributes"].append(_attr("ocr.queue_wait_seconds", trace.queue_wait()))
+            if trace.pool_wait() is not None:
+                otlp["attributes"].append(_attr("ocr.pool_wait_seconds", trace.pool_wait()))
+            otlp["status"] = {"code": STATUS_CODE_ERROR if status in ERROR_STATUSES else STATUS_CODE_OK}
+            if error:
+                otlp["status"]["message"] = error
+        else:
+            otlp["parentSpanId"] = span["parentSpanId"]
+
+        spans.append(otlp)
+
+    return {
+        "resourceSpans": [{
+            "resource": {
+                "attributes": [
+                    _attr("service.name", TRACE_SERVICE_NAME),
+                    _attr("process.pid", os.getpid()),
+                ]
+            },
+            "scopeSpans": [{
+                "scope": {"name": "ocr-worker.tracing"},
+                "spans": spans,
+            }],
+        }]
+    }
+
+
+def export_trace(trace, status: str, error: str = None, path: str = TRACE_EXPORT_FILE):
+    """
+    เขียน trace ต่อท้ายไฟล์ OTLP/JSON lines (1 บรรทัดต่อ job) ถ้าตั้ง TRACE_EXPORT_FILE ไว้
+
+    ไฟล์รูปแบบเดียวกับ file exporter ของ OpenTelemetry Collector
+    ส่งต่อด้วย otlpjsonfile receiver ได้ (best-effort ไม่ทำให้ job fail)
+    """
+    if not path or trace is None:
+        return
+
+    try:
+        line = json.dumps(to_otlp(trace, status, error), ensure_ascii=False) + "\n"
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # O_APPEND + write ครั้งเดียว: หลาย OCR process เขียนไฟล์เดียวกันได้ไม่ปนบรรทัด
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            os.write(fd, line.encode("utf-8"))
+        finally:
+            os.close(fd)
+    except Exception as e:
+        print(f"⚠️ Trace export failed: {e}")
@@ -0,0 +1,152 @@
+import json
+import re
+import secrets
+import time
+
+from src.profiling.stages import StageTimer
+
+_TRACE_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+
+def new_trace_id() -> str:
+    return secrets.token_hex(16)
+
+
+def new_span_id() -> str:
+    return secrets.token_hex(8)
+
+
+def _parse_trace_id(value) -> str:
+    """
+    trace_id จาก job message (hex 32 ตัวแบบ W3C / OTLP) ถ้าไม่มีหรือไม่ถูกต้องสร้างใหม่
+    """
+    if isinstance(value, str):
+        value = value.strip().lower().replace("-", "")
+        if _TRACE_ID_RE.match(value) and value != "0" * 32:
+            return value
+    return new_trace_id()
+
+
+def _parse_timestamp(value):
+    """
+    enqueued_at เป็น epoch seconds (รับ milliseconds ด้วย เผื่อฝั่ง JS ส่ง Date.now())
+    """
+    try:
+        ts = float(value)
+    except (TypeError, ValueError):
+        return None
+
+    if ts <= 0:
+        return None
+    return ts / 1000 if ts > 1e11 else ts
+
+
+def restamp(data: str) -> str:
+    """
+    ตั้ง enqueued_at ใหม่ให้ job ที่ถูก publish ซ้ำ (retry / replay)
+    คง trace_id เดิมไว้ queue wait จะนับแค่รอบนี้ ไม่รวม backoff
+    """
+    try:
+        job = json.loads(data)
+    except (TypeError, ValueError):
+        return data
+
+    if not isinstance(job, dict):
+        return data
+
+    job["enqueued_at"] = time.time()
+    return json.dumps(job)
+
+
+class JobTrace(StageTimer):
+    """
+    Trace ของ 1 job: queue wait + stage ของ pipeline เป็น spans
+
+    ใช้แทน StageTimer ได้เลย (pipeline / profiler เห็นเป็น timer ปกติ)
+    - queue_wait: enqueued_at (API publish) → worker รับ message
+    - pool_wait: worker รับ message → OCR process เริ่มทำ
+    - stage อื่นๆ: จาก timer.stage(...)
+    """
+
+    def __init__(self, job_id, trace_id=None, enqueued_at=None, received_at=None):
+        super().__init__()
+        self.job_id = job_id
+        self.trace_id = _parse_trace_id(trace_id)
+        self.span_id = new_span_id()
+        self.started_at = time.time()
+        self.received_at = _parse_timestamp(received_at)
+        self.enqueued_at = _parse_timestamp(enqueued_at)
+
+        # นาฬิกาฝั่ง API อาจเหลื่อมกับ worker: ไม่ให้ queue wait ติดลบ
+        first_seen = self.received_at or self.started_at
+        if self.enqueued_at is not None:
+            self.enqueued_at = min(self.enqueued_at, first_seen)
+
+    @classmethod
+    def from_job(cls, job: dict, received_at=None):
+        return cls(
+            job.get("job_id"),
+            trace_id=job.get("trace_id"),
+            enqueued_at=job.get("enqueued_at"),
+            received_at=received_at
+        )
+
+    def queue_wait(self):
+        """
+        seconds ตั้งแต่ publish จน worker รับ message (ตรงกับ span queue_wait)
+        None ถ้า message ไม่มี enqueued_at
+        """
+        if self.enqueued_at is None:
+            return None
+        return round((self.received_at or self.started_at) - self.enqueued_at, 4)
+
+    def pool_wait(self):
+        """
+        seconds ตั้งแต่ worker รับ message จน OCR process เริ่มทำ (ตรงกับ span pool_wait)
+        """
+        if self.received_at is None:
+            return None
+        return round(self.started_at - self.received_at, 4)
+
+    def spans(self, end=None) -> list:
+        """
+        spans ทั้งหมด (root span ก่อน) เป็น dict: name, spanId, parentSpanId, start, end, seconds
+        """
+        end = end or time.time()
+        start = self.enqueued_at or self.received_at or self.started_at
+        spans = [self._span("ocr_job", start, end, span_id=self.span_id, parent=None)]
+
+        if self.enqueued_at is not None:
+            spans.append(self._span("queue_wait", self.enqueued_at, self.received_at or self.started_at))
+        if self.received_at is not None:
+            spans.append(self._span("pool_wait", self.received_at, self.started_at))
+
+        for s in self.stages:
+            # span id ติดไว้กับ stage เพื่อให้ payload กับ exporter ได้ id เดียวกัน
+            s.setdefault("span_id", new_span_id())
+            spans.append(self._span(s["name"], s["start"], s["end"], span_id=s["span_id"]))
+
+        return spans
+
+    def _span(self, name, start, end, span_id=None, parent="root"):
+        return {
+            "name": name,
+            "spanId": span_id or new_span_id(),
+            "parentSpanId": self.span_id if parent == "root" else parent,
+            "start": start,
+            "end": end,
+            "seconds": round(max(end - start, 0), 4),
+        }
+
+    def to_payload(self) -> dict:
+        """
+        trace สำหรับแนบไปกับ callback (spans ที่จบแล้ว ณ ตอนเรียก)
+        """
+        now = time.time()
+        return {
+            "traceId": self.trace_id,
+            "queueWaitSeconds": self.queue_wait(),
+            "poolWaitSeconds": self.pool_wait(),
+            "serviceSeconds": round(now - self.started_at, 4),
+            "spans": self.spans(end=now),
+        }
@@ -0,0 +1,69 @@
+"""
+ความถูกต้องของ src/parser/normalizer.py
+
+ตัวอย่างเป็นข้อความจาก zone วันที่ / จำนวนเงินแบบที่ OCR อ่านได้จริง
+(จุดหาย, เว้นวรรคเกิน, เลขไทย, ปี พ.ศ., มีเวลาต่อท้าย)
+"""
+
+import pytest
+
+from src.parser.normalizer import normalize_date, normalize_amount
+
+DATE_SAMPLES = [
+    ("01/02/2025", "2025-02-01"),
+    ("1/2/25", "2025-02-01"),
+    ("01-02-2025 10:32", "2025-02-01"),
+    ("01.02.2025", "2025-02-01"),
+    ("2025-02-01", "2025-02-01"),
+    ("2025/02/01", "2025-02-01"),
+    ("20250201", "2025-02-01"),
+    ("01 / 02 / 2568", "2025-02-01"),
+    ("1 ก.พ. 2025", "2025-02-01"),
+    ("1 ก.พ. 2568", "2025-02-01"),
+    ("1 ก.พ. 68", "2025-02-01"),
+    ("1 ก.พ 68 14:05 น.", "2025-02-01"),
+    ("1 กพ. 68", "2025-02-01"),
+    ("1ก.พ.68", "2025-02-01"),
+    ("01 ก. พ. 2568", "2025-02-01"),
+    ("๑ ก.พ. ๒๕๖๘", "2025-02-01"),
+    ("15 มกราคม 2568", "2025-01-15"),
+    ("31 ธันวาคม 2567", "2024-12-31"),
+    ("29 ก.พ. 2567", "2024-02-29"),
+    ("5 เม.ย. 68 - 09:12", "2025-04-05"),
+    ("วันที่ 12 มิ.ย. 2568 เวลา 18:40", "2025-06-12"),
+    ("12 Jun 2025 18:40", "2025-06-12"),
+    ("14:05 น. 01/02/25", "2025-02-01"),
+    ("Ref 1 x 12/01/2025", "2025-01-12"),
+    ("32/01/2025 01/02/2025", "2025-02-01"),
+    ("31 พ.ย. 68", None),
+    ("30 ก.พ. 2568", None),
+    ("ไม่มีวันที่", None),
+    ("", None),
+]
+
+AMOUNT_SAMPLES = [
+    ("1,250.00", 1250.0),
+    ("1,250.00 บาท", 1250.0),
+    ("฿ 1,250.00", 1250.0),
+    ("1,250", 1250.0),
+    ("12,50", 12.5),
+    ("350.5", 350.5),
+    ("350 . 50 บาท", 350.5),
+    ("๑,๒๕๐.๐๐", 1250.0),
+    ("10,000,000.00 THB", 10000000.0),
+    ("จำนวน: 99.00", 99.0),
+    # ช่องว่างไม่ใช่ตัวคั่นหลักพัน: ตัวเลขแรกคือจำนวนเงิน
+    ("5 100.00", 5.0),
+    ("บาท", None),
+    ("", None),
+]
+
+
+@pytest.mark.parametrize("raw, expected", DATE_SAMPLES)
+def test_normalize_date(raw, expected):
+    assert normalize_date(raw) == expected
+
+
+@pytest.mark.parametrize("raw, expected", AMOUNT_SAMPLES)
+def test_normalize_amount(raw, expected):
+    assert normalize_amount(raw) == expected
@@ -24,6 +24,8 @@ export class QueueService {
       callback_url: callbackUrl,
       slipId,
       userId,
+      trace_id: uuidv4().replace(/-/g, ''),
+      enqueued_at: Date.now() / 1000,
     };
 
     await redis.publish(OCR_JOBS_CHANNEL, JSON.stringify(job));
@@ -14,6 +14,9 @@ export interface OcrJobMessage {
   // Metadata for backend reference (optional, worker preserves unknown keys)
   slipId: string;
   userId: string;
+  // Trace context: worker reports queue wait / stage spans back in the callback
+  trace_id: string; // 32 hex chars (W3C / OTLP trace id)
+  enqueued_at: number; // Epoch seconds at publish time
 }
 
 export interface SlipResponse {